@@ -0,0 +1,18 @@
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0007_auto_20190908_1737'),
+    ]
+
+    operations = [
+        migrations.RunSQL(
+            '''
+            CREATE INDEX geolocations_point_geography_idx
+            ON geolocations USING gist ((point::geography))
+            ''',
+            'DROP INDEX geolocations_point_geography_idx'
+        )
+    ]
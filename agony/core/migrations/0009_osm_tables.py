@@ -0,0 +1,32 @@
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0008_geolocations_point_geography'),
+    ]
+
+    operations = [
+        migrations.RunSQL(
+            '''
+            CREATE TABLE osm_boundaries (
+                id serial PRIMARY KEY,
+                name varchar(128) NOT NULL,
+                kind varchar(16) NOT NULL,
+                geometry geometry(MultiPolygon, 4326) NOT NULL
+            );
+            CREATE INDEX osm_boundaries_geometry_idx
+            ON osm_boundaries USING gist (geometry);
+            CREATE INDEX osm_boundaries_kind_idx ON osm_boundaries (kind);
+            CREATE TABLE osm_roads (
+                id serial PRIMARY KEY,
+                name varchar(128) NOT NULL,
+                geometry geometry(MultiLineString, 4326) NOT NULL
+            );
+            CREATE INDEX osm_roads_geometry_idx
+            ON osm_roads USING gist (geometry);
+            ''',
+            'DROP TABLE osm_roads; DROP TABLE osm_boundaries;'
+        )
+    ]
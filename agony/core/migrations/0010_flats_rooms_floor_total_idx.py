@@ -0,0 +1,18 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0009_osm_tables'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='flat',
+            index=models.Index(
+                fields=['rooms', 'floor', 'total_floor'],
+                name='flats_rooms_floor_total_idx'
+            ),
+        ),
+    ]
@@ -0,0 +1,32 @@
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0010_flats_rooms_floor_total_idx'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='FlatPrice',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('price', models.DecimalField(decimal_places=2, max_digits=10)),
+                ('rate', models.DecimalField(decimal_places=2, max_digits=10)),
+                ('observed_at', models.DateTimeField()),
+                ('flat', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='prices', to='core.Flat')),
+            ],
+            options={
+                'db_table': 'flat_prices',
+            },
+        ),
+        migrations.RunSQL(
+            '''
+            INSERT INTO flat_prices (flat_id, price, rate, observed_at)
+            SELECT id, price, rate, published FROM flats
+            ''',
+            migrations.RunSQL.noop
+        )
+    ]
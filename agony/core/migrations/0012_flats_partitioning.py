@@ -0,0 +1,239 @@
+from django.db import migrations, models
+import django.db.models.deletion
+
+# Flats are range-partitioned by the publication month; the partitions are
+# named like "flats_y2019m09". Unique constraints must include the partition
+# key, and foreign keys can't reference the partitioned table's id, so the
+# dependants' cascade deletion is done by the trigger. Partitions are
+# created in advance and archived by the `FlatPartitionKeeper` worker along
+# with their dependants' rows.
+# The unique constraints are relaxed: they hold only within a month. Neither
+# a flat's URL nor its place (geolocation, rooms, floor & total floor) is
+# unique by itself anymore, so reapy's repository keeps them unique on
+# insertion: it skips the URLs and the places which are already stored in any
+# partition, under their advisory locks. PostgreSQL 11+ is required.
+partition = [
+    '''
+    ALTER TABLE flats RENAME TO flats_unpartitioned
+    ''',
+    '''
+    CREATE TABLE flats (
+        LIKE flats_unpartitioned INCLUDING DEFAULTS,
+        CONSTRAINT flats_partitioned_pkey PRIMARY KEY (id, published),
+        CONSTRAINT flats_url_published_key UNIQUE (url, published),
+        CONSTRAINT flats_geolocation_rooms_floor_total_floor_published_key
+        UNIQUE (geolocation_id, rooms, floor, total_floor, published),
+        CONSTRAINT flats_geolocation_id_fk_geolocations_id
+        FOREIGN KEY (geolocation_id) REFERENCES geolocations (id)
+        DEFERRABLE INITIALLY DEFERRED
+    ) PARTITION BY RANGE (published)
+    ''',
+    '''
+    ALTER SEQUENCE flats_id_seq OWNED BY flats.id
+    ''',
+    '''
+    CREATE FUNCTION create_flats_partition(month date) RETURNS text AS $$
+    DECLARE
+        start date := date_trunc('month', month)::date;
+        name text := 'flats_y' || to_char(month, 'YYYY') || 'm' ||
+                     to_char(month, 'MM');
+    BEGIN
+        EXECUTE format(
+            'CREATE TABLE IF NOT EXISTS %I PARTITION OF flats '
+            'FOR VALUES FROM (%L) TO (%L)',
+            name, start, (start + interval '1 month')::date
+        );
+        RETURN name;
+    END
+    $$ LANGUAGE plpgsql
+    ''',
+    '''
+    SELECT create_flats_partition(m::date)
+    FROM generate_series(
+        date_trunc(
+            'month',
+            (SELECT coalesce(min(published), now()) FROM flats_unpartitioned)
+        ),
+        date_trunc('month', now()) + interval '2 months',
+        interval '1 month'
+    ) AS m
+    ''',
+    '''
+    CREATE TABLE flats_default PARTITION OF flats DEFAULT
+    ''',
+    '''
+    CREATE INDEX flats_published_partitioned_idx ON flats (published)
+    ''',
+    '''
+    CREATE INDEX flats_geolocation_id_partitioned_idx
+    ON flats (geolocation_id)
+    ''',
+    '''
+    CREATE INDEX flats_rooms_floor_total_partitioned_idx
+    ON flats (rooms, floor, total_floor)
+    ''',
+    '''
+    INSERT INTO flats SELECT * FROM flats_unpartitioned
+    ''',
+    '''
+    DROP TABLE flats_unpartitioned CASCADE
+    ''',
+    '''
+    ALTER INDEX flats_rooms_floor_total_partitioned_idx
+    RENAME TO flats_rooms_floor_total_idx
+    ''',
+    '''
+    CREATE FUNCTION delete_flat_dependants() RETURNS trigger AS $$
+    BEGIN
+        -- the row has just been moved into another partition
+        IF EXISTS (SELECT 1 FROM flats WHERE id = OLD.id) THEN
+            RETURN OLD;
+        END IF;
+        DELETE FROM flats_details WHERE flat_id = OLD.id;
+        DELETE FROM flat_prices WHERE flat_id = OLD.id;
+        DELETE FROM core_user_saved_flats WHERE flat_id = OLD.id;
+        RETURN OLD;
+    END
+    $$ LANGUAGE plpgsql
+    ''',
+    '''
+    CREATE TRIGGER flats_dependants AFTER DELETE ON flats
+    FOR EACH ROW EXECUTE PROCEDURE delete_flat_dependants()
+    ''',
+    '''
+    CREATE SCHEMA IF NOT EXISTS archive
+    '''
+]
+
+# Archived partitions aren't restored
+unpartition = [
+    '''
+    DROP TRIGGER flats_dependants ON flats
+    ''',
+    '''
+    DROP FUNCTION delete_flat_dependants()
+    ''',
+    '''
+    ALTER TABLE flats RENAME TO flats_partitioned
+    ''',
+    '''
+    ALTER INDEX flats_rooms_floor_total_idx
+    RENAME TO flats_rooms_floor_total_partitioned_idx
+    ''',
+    '''
+    CREATE TABLE flats (LIKE flats_partitioned INCLUDING DEFAULTS)
+    ''',
+    '''
+    INSERT INTO flats SELECT * FROM flats_partitioned
+    ''',
+    '''
+    ALTER SEQUENCE flats_id_seq OWNED BY flats.id
+    ''',
+    '''
+    DROP TABLE flats_partitioned
+    ''',
+    '''
+    DROP FUNCTION create_flats_partition(date)
+    ''',
+    '''
+    ALTER TABLE flats
+    ADD CONSTRAINT flats_pkey PRIMARY KEY (id),
+    ADD CONSTRAINT flats_url_key UNIQUE (url),
+    ADD CONSTRAINT flat_geolocation_id_rooms_floor_total_floor_key
+    UNIQUE (geolocation_id, rooms, floor, total_floor),
+    ADD CONSTRAINT flats_geolocation_id_fk_geolocations_id
+    FOREIGN KEY (geolocation_id) REFERENCES geolocations (id)
+    DEFERRABLE INITIALLY DEFERRED
+    ''',
+    '''
+    CREATE INDEX flats_geolocation_id_idx ON flats (geolocation_id)
+    ''',
+    '''
+    CREATE INDEX flats_rooms_floor_total_idx
+    ON flats (rooms, floor, total_floor)
+    ''',
+    '''
+    ALTER TABLE flats_details
+    ADD CONSTRAINT flats_details_flat_id_fk_flats_id
+    FOREIGN KEY (flat_id) REFERENCES flats (id) DEFERRABLE INITIALLY DEFERRED
+    ''',
+    '''
+    ALTER TABLE flat_prices
+    ADD CONSTRAINT flat_prices_flat_id_fk_flats_id
+    FOREIGN KEY (flat_id) REFERENCES flats (id) DEFERRABLE INITIALLY DEFERRED
+    ''',
+    '''
+    ALTER TABLE core_user_saved_flats
+    ADD CONSTRAINT core_user_saved_flats_flat_id_fk_flats_id
+    FOREIGN KEY (flat_id) REFERENCES flats (id) DEFERRABLE INITIALLY DEFERRED
+    '''
+]
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0011_flatprice'),
+    ]
+
+    operations = [
+        migrations.RunSQL(
+            partition,
+            unpartition,
+            state_operations=[
+                migrations.AlterField(
+                    model_name='flat',
+                    name='url',
+                    field=models.URLField(max_length=400),
+                ),
+                migrations.RemoveConstraint(
+                    model_name='flat',
+                    name='flat_geolocation_id_rooms_floor_total_floor_key',
+                ),
+                migrations.AddConstraint(
+                    model_name='flat',
+                    constraint=models.UniqueConstraint(
+                        fields=['url', 'published'],
+                        name='flats_url_published_key'
+                    ),
+                ),
+                migrations.AddConstraint(
+                    model_name='flat',
+                    constraint=models.UniqueConstraint(
+                        fields=[
+                            'geolocation_id', 'rooms', 'floor', 'total_floor',
+                            'published'
+                        ],
+                        name='flats_geolocation_rooms_floor_total_floor_published_key'
+                    ),
+                ),
+                migrations.AlterField(
+                    model_name='flat',
+                    name='details',
+                    field=models.ManyToManyField(
+                        db_constraint=False,
+                        db_table='flats_details',
+                        to='core.Detail'
+                    ),
+                ),
+                migrations.AlterField(
+                    model_name='flatprice',
+                    name='flat',
+                    field=models.ForeignKey(
+                        db_constraint=False,
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name='prices',
+                        to='core.Flat'
+                    ),
+                ),
+                migrations.AlterField(
+                    model_name='user',
+                    name='saved_flats',
+                    field=models.ManyToManyField(
+                        db_constraint=False,
+                        to='core.Flat'
+                    ),
+                ),
+            ]
+        )
+    ]
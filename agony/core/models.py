@@ -3,7 +3,7 @@ from django.contrib.auth.models import BaseUserManager, AbstractBaseUser
 from django.contrib.gis.db.models import (
     EmailField, BooleanField, Model, DateField, URLField, CharField, FloatField,
     DecimalField, ManyToManyField, SmallIntegerField, ForeignKey, CASCADE,
-    UniqueConstraint, PointField
+    UniqueConstraint, PointField, Index, DateTimeField
 )
 
 
@@ -33,7 +33,8 @@ class Detail(Model):
 
 
 class Estate(Model):
-    url = URLField(max_length=400, unique=True)
+    # kept unique by reapy, since the partitioned table can't enforce it
+    url = URLField(max_length=400)
     avatar = URLField(max_length=400, null=True)
     published = DateField()
     geolocation = ForeignKey(Geolocation, on_delete=CASCADE)
@@ -58,7 +59,9 @@ class Flat(Estate):
     floor = SmallIntegerField()
     total_floor = SmallIntegerField()
     ceiling_height = FloatField(null=True)
-    details = ManyToManyField(Detail, db_table='flats_details')
+    details = ManyToManyField(
+        Detail, db_table='flats_details', db_constraint=False
+    )
     saved_field = 'saved_flats'
     lookups = {
         'state': 'geolocation__state',
@@ -86,14 +89,44 @@ class Flat(Estate):
 
     class Meta:
         db_table = 'flats'
+        # unique within a month only; reapy keeps URLs and places unique
+        # across the months on insertion
         constraints = [
             UniqueConstraint(
-                fields=['geolocation_id', 'rooms', 'floor', 'total_floor'],
-                name='flat_geolocation_id_rooms_floor_total_floor_key'
+                fields=['url', 'published'],
+                name='flats_url_published_key'
+            ),
+            UniqueConstraint(
+                fields=[
+                    'geolocation_id', 'rooms', 'floor', 'total_floor',
+                    'published'
+                ],
+                name='flats_geolocation_rooms_floor_total_floor_published_key'
+            )
+        ]
+        indexes = [
+            Index(
+                fields=['rooms', 'floor', 'total_floor'],
+                name='flats_rooms_floor_total_idx'
             )
         ]
 
 
+class FlatPrice(Model):
+    flat = ForeignKey(
+        Flat, on_delete=CASCADE, related_name='prices', db_constraint=False
+    )
+    price = DecimalField(max_digits=10, decimal_places=2)
+    rate = DecimalField(max_digits=10, decimal_places=2)
+    observed_at = DateTimeField()
+
+    class Meta:
+        db_table = 'flat_prices'
+
+    def __str__(self) -> str:
+        return f'[{self.flat_id}, {self.price}, {self.observed_at}]'
+
+
 class UserManager(BaseUserManager):
     def create_user(self, email: Optional[str], password: str) -> 'User':
         if email is None:
@@ -116,7 +149,7 @@ class User(AbstractBaseUser):
     email = EmailField(db_index=True, unique=True)
     is_active = BooleanField(default=True)
     is_staff = BooleanField(default=False)
-    saved_flats = ManyToManyField(Flat)
+    saved_flats = ManyToManyField(Flat, db_constraint=False)
     objects = UserManager()
     USERNAME_FIELD = 'email'
 
@@ -0,0 +1,208 @@
+#!/bin/env python3
+"""
+*reapy*'s parsers' micro-benchmark
+
+This script runs every entry point of the flat parsers (stop, page,
+offer & junk parsing) over the test fixtures and measures the throughput,
+latencies and peak memory usage for each parser's backend. Each backend
+is measured in a separate fresh process, so the peak RSS isn't affected
+by the others. The results are printed and stored into
+`benchmarks/<commit>.json` to be compared with other commits' ones:
+```
+$ python benchmark.py -n 50
+$ python benchmark.py -n 50 -c benchmarks/<old_commit>.json
+```
+"""
+from argparse import ArgumentParser
+from concurrent.futures.process import ProcessPoolExecutor
+from glob import glob
+from json import dump, load
+from logging import CRITICAL, disable
+from math import ceil
+from multiprocessing import get_context
+from os import makedirs
+from os.path import basename, join
+from resource import RUSAGE_SELF, getrusage
+from subprocess import CalledProcessError, check_output
+from time import perf_counter
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from core import BASE_DIR
+from core.backends import LxmlBackend, SoupBackend
+from core.parsers import DomRiaFlatParser, OlxFlatParser, Parser
+from core.utils import read
+
+# Backends to be compared
+backends = (SoupBackend, LxmlBackend)
+
+# Parsers to be measured and their fixtures' prefixes
+parsers = ((OlxFlatParser, 'olx_flat'), (DomRiaFlatParser, 'dom_ria_flat'))
+
+# "Raw offer" fields which are supplied by the page parsing
+offer_fields = {
+    'avatar': None, 'area': None, 'living_area': None, 'kitchen_area': None
+}
+
+
+def __fixtures(folder: str, prefix: str) -> List[str]:
+    """
+    Reads all parser's fixtures from the folder.
+
+    :param folder: fixtures' folder name
+    :param prefix: parser's fixtures' prefix
+    :return: fixtures' markups
+    """
+    return [
+        read(join('fixtures', folder, basename(p)))
+        for p in sorted(glob(join(BASE_DIR, 'fixtures', folder, f'{prefix}*')))
+    ]
+
+
+def __entries(parser: Parser, prefix: str) -> Dict[str, Tuple[Callable, List]]:
+    """
+    Binds parser's entry points to their arguments' makers.
+
+    :param parser: parser to be measured
+    :param prefix: parser's fixtures' prefix
+    :return: entry points & the lists of their arguments' makers
+    """
+    def offer(markup: str) -> Callable:
+        return lambda: {'url': '', 'markup': markup, **offer_fields}
+
+    def page(markup: str) -> Callable:
+        return lambda: markup
+
+    return {
+        'parse_stop': (
+            parser.parse_stop,
+            [page(m) for m in __fixtures('test_parse_stop', prefix)]
+        ),
+        'parse_page': (
+            parser.parse_page,
+            [page(m) for m in __fixtures('test_parse_page', prefix)]
+        ),
+        'parse_offer': (
+            parser.parse_offer,
+            [offer(m) for m in __fixtures('test_parse_offer', prefix)]
+        ),
+        'parse_junk': (
+            parser.parse_junk,
+            [offer(m) for m in __fixtures('test_parse_junk', prefix)]
+        )
+    }
+
+
+def __percentile(latencies: List[float], share: float) -> float:
+    """
+    Finds the nearest-rank percentile.
+
+    :param latencies: sorted latencies
+    :param share: percentile's share (from 0 to 1)
+    :return: percentile's latency
+    """
+    return latencies[max(ceil(share * len(latencies)) - 1, 0)]
+
+
+def measure(backend_class: type, number: int) -> Dict[str, Any]:
+    """
+    Measures all parsers' entry points with the backend.
+
+    :param backend_class: parsers' backend class
+    :param number: number of runs of each fixture
+    :return: backend's results
+    """
+    disable(CRITICAL)
+    results = {}
+    for parser_class, prefix in parsers:
+        parser = parser_class(backend_class())
+        for name, (entry, makers) in __entries(parser, prefix).items():
+            if len(makers) == 0:
+                continue
+            latencies = []
+            for _ in range(number):
+                for maker in makers:
+                    argument = maker()
+                    start = perf_counter()
+                    entry(argument)
+                    latencies.append(perf_counter() - start)
+            latencies.sort()
+            results[f'{parser_class.__name__}.{name}'] = {
+                'calls': len(latencies),
+                'throughput': len(latencies) / sum(latencies),
+                'p50': __percentile(latencies, 0.5) * 1000,
+                'p99': __percentile(latencies, 0.99) * 1000
+            }
+    return {
+        'peak_rss': getrusage(RUSAGE_SELF).ru_maxrss,
+        'entries': results
+    }
+
+
+def __commit() -> str:
+    """
+    Finds the current commit's short hash.
+
+    :return: commit's hash or 'local' outside of the repository
+    """
+    try:
+        return check_output(
+            ('git', 'rev-parse', '--short', 'HEAD'), cwd=BASE_DIR
+        ).decode().strip()
+    except (CalledProcessError, OSError):
+        return 'local'
+
+
+def __report(
+    results: Dict[str, Any], baseline: Optional[Dict[str, Any]] = None
+):
+    """
+    Prints the results (and their changes concernedly the baseline).
+
+    :param results: current results
+    :param baseline: other commit's results
+    """
+    def change(new: float, old: Optional[float]) -> str:
+        return '' if old is None else f' ({(new - old) / old:+.1%})'
+
+    for backend, stats in results['backends'].items():
+        old = (baseline or {}).get('backends', {}).get(backend, {})
+        print(
+            f'{backend}: peak RSS {stats["peak_rss"]} KiB'
+            f'{change(stats["peak_rss"], old.get("peak_rss"))}'
+        )
+        for entry, values in stats['entries'].items():
+            previous = old.get('entries', {}).get(entry, {})
+            print(
+                f'  {entry:<30} {values["throughput"]:>9.1f} calls/s'
+                f'{change(values["throughput"], previous.get("throughput"))}'
+                f'  p50 {values["p50"]:.2f} ms'
+                f'{change(values["p50"], previous.get("p50"))}'
+                f'  p99 {values["p99"]:.2f} ms'
+                f'{change(values["p99"], previous.get("p99"))}'
+            )
+
+
+if __name__ == '__main__':
+    arguments = ArgumentParser(description='Measures parsers\' performance.')
+    arguments.add_argument(
+        '-n', '--number', type=int, default=20,
+        help='number of runs of each fixture'
+    )
+    arguments.add_argument(
+        '-c', '--compare', help='path of the other commit\'s results'
+    )
+    options = arguments.parse_args()
+    commit = __commit()
+    results = {'commit': commit, 'number': options.number, 'backends': {}}
+    for backend in backends:
+        with ProcessPoolExecutor(1, get_context('spawn')) as executor:
+            results['backends'][backend.__name__] = executor.submit(
+                measure, backend, options.number
+            ).result()
+    baseline = None
+    if options.compare is not None:
+        with open(options.compare) as stream:
+            baseline = load(stream)
+    makedirs(join(BASE_DIR, 'benchmarks'), exist_ok=True)
+    with open(join(BASE_DIR, 'benchmarks', f'{commit}.json'), 'w') as stream:
+        dump(results, stream, indent=2)
+    __report(results, baseline)
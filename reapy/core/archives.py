@@ -0,0 +1,193 @@
+"""
+This module describes archives - workers' long-term memory of the markup
+
+When a site changes its markup, the parser fails and the offers are lost,
+since their pages are dropped right after the parsing. An archive keeps
+the fetched offer pages for a while, so they can be parsed again (by the
+fixed parser) without any crawling. Pages are stored as standalone zstd
+frames appended to the segment files; an SQLite index maps the pages'
+digests onto the segments' offsets and keeps every fetch (URL, time and
+the page's fields). Bodies are content-addressed, so an unchanged page is
+stored only once no matter how many times it's fetched.
+"""
+from fcntl import LOCK_EX, flock
+from hashlib import sha1
+from json import dumps, loads
+from os import SEEK_END, listdir, makedirs, remove
+from os.path import exists, getsize, join
+from time import time
+from typing import Any, Dict, Iterator, Optional, Tuple
+from zstandard import ZstdCompressor, ZstdDecompressor
+from core import BASE_DIR
+from core.caches import Cache
+
+
+class MarkupArchive(Cache):
+    """
+    Append-only store of the compressed offer pages. New bodies go to the
+    latest segment until it outgrows the max size. Fetches older than the
+    max age are evicted on closing along with the bodies nobody refers to;
+    segments without live bodies are deleted (except the latest one).
+    Overlapping runs may share the archive, so appends to a segment are
+    serialized by the segment file's lock.
+
+    Class properties:
+        _segment_size: segment file's max size in bytes
+        _level: zstd compression level
+        _max_age: fetch's lifetime in seconds
+
+    Instance properties:
+        _folder: absolute segments' folder path
+        _compressor: zstd frames' compressor
+        _decompressor: zstd frames' decompressor
+    """
+    _schema = '''
+        CREATE TABLE IF NOT EXISTS bodies (
+            digest TEXT PRIMARY KEY, segment INTEGER,
+            offset INTEGER, length INTEGER
+        );
+        CREATE INDEX IF NOT EXISTS bodies_segment_idx ON bodies (segment);
+        CREATE TABLE IF NOT EXISTS fetches (
+            url TEXT, fetched REAL, digest TEXT, encoding TEXT, form TEXT
+        );
+        CREATE INDEX IF NOT EXISTS fetches_fetched_idx ON fetches (fetched);
+    '''
+    _segment_size = 64 * 1024 * 1024
+    _level = 9
+    _max_age = 30 * 24 * 60 * 60
+
+    def __init__(self, path: str):
+        super().__init__(join(path, 'index.sqlite3'))
+        self._folder = join(BASE_DIR, path)
+        self._compressor = ZstdCompressor(self._level)
+        self._decompressor = ZstdDecompressor()
+
+    def open(self):
+        """
+        Creates the segments' folder and connects to the index.
+        """
+        makedirs(self._folder, exist_ok=True)
+        super().open()
+
+    def _segment_path(self, segment: int) -> str:
+        """
+        Builds segment file's path.
+
+        :param segment: segment's number
+        :return: absolute segment's path
+        """
+        return join(self._folder, f'{segment:06d}.zst')
+
+    def put(
+        self,
+        url: str,
+        body: bytes,
+        encoding: str,
+        form: Optional[Dict[str, Any]] = None
+    ):
+        """
+        Registers the page's fetch and stores its body unless the same
+        body is already archived.
+
+        :param url: offer page's URL
+        :param body: page's bytes
+        :param encoding: body's text encoding
+        :param form: "raw offer" fields supplied by the page parsing
+        """
+        digest = sha1(body).hexdigest()
+        found = self._connection.execute(
+            'SELECT 1 FROM bodies WHERE digest = ?', (digest,)
+        ).fetchone()
+        if found is None:
+            self._append(digest, body)
+        self._connection.execute(
+            '''
+            INSERT INTO fetches (url, fetched, digest, encoding, form)
+            VALUES (?, ?, ?, ?, ?)
+            ''',
+            (url, time(), digest, encoding, dumps(form or {}))
+        )
+
+    def _append(self, digest: str, body: bytes):
+        """
+        Compresses the body and appends it to the latest segment (or to a
+        new one if the latest is full).
+
+        :param digest: body's SHA-1 digest
+        :param body: page's bytes
+        """
+        segment = self._connection.execute(
+            'SELECT MAX(segment) FROM bodies'
+        ).fetchone()[0] or 0
+        path = self._segment_path(segment)
+        if exists(path) and getsize(path) >= self._segment_size:
+            segment += 1
+            path = self._segment_path(segment)
+        frame = self._compressor.compress(body)
+        with open(path, 'ab') as stream:
+            flock(stream, LOCK_EX)  # released on closing
+            offset = stream.seek(0, SEEK_END)
+            stream.write(frame)
+        self._connection.execute(
+            '''
+            INSERT OR IGNORE INTO bodies (digest, segment, offset, length)
+            VALUES (?, ?, ?, ?)
+            ''',
+            (digest, segment, offset, len(frame))
+        )
+
+    def fetches(
+        self, since: float
+    ) -> Iterator[Tuple[str, str, str, Dict[str, Any], float]]:
+        """
+        Lists the latest fetch of every URL fetched since the moment.
+
+        :param since: UNIX timestamp of the earliest fetch
+        :return: URLs, bodies' digests, encodings, pages' fields and
+        fetches' UNIX timestamps
+        """
+        for url, fetched, digest, encoding, form in self._connection.execute(
+            '''
+            SELECT url, MAX(fetched), digest, encoding, form FROM fetches
+            WHERE fetched >= ?
+            GROUP BY url
+            ''',
+            (since,)
+        ):
+            yield url, digest, encoding, loads(form), fetched
+
+    def read(self, digest: str) -> Optional[bytes]:
+        """
+        Reads and decompresses the archived body.
+
+        :param digest: body's SHA-1 digest
+        :return: page's bytes or None if the body's absent
+        """
+        row = self._connection.execute(
+            'SELECT segment, offset, length FROM bodies WHERE digest = ?',
+            (digest,)
+        ).fetchone()
+        if row is None:
+            return None
+        with open(self._segment_path(row[0]), 'rb') as stream:
+            stream.seek(row[1])
+            return self._decompressor.decompress(stream.read(row[2]))
+
+    def _evict(self):
+        self._connection.execute(
+            'DELETE FROM fetches WHERE fetched <= ?', (time() - self._max_age,)
+        )
+        self._connection.execute(
+            'DELETE FROM bodies WHERE digest NOT IN (SELECT digest FROM fetches)'
+        )
+        latest = self._connection.execute(
+            'SELECT MAX(segment) FROM bodies'
+        ).fetchone()[0]
+        live = {r[0] for r in self._connection.execute(
+            'SELECT DISTINCT segment FROM bodies'
+        )}
+        for name in listdir(self._folder):
+            if name.endswith('.zst'):
+                segment = int(name[:-4])
+                if segment != latest and segment not in live:
+                    remove(join(self._folder, name))
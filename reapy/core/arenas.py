@@ -0,0 +1,135 @@
+"""
+This module describes arenas - shared memory regions for the big payloads
+
+Offer pages are hundreds of kilobytes long, so pickling them into the
+process pool (and the pool's pickling back) takes noticeable time. An arena
+is an anonymous shared memory mapping, which is created before the pool's
+processes are forked; that's why the whole pool sees the same bytes and only
+tiny :class:`core.arenas.Slice` handles travel between the processes.
+"""
+from itertools import count
+from mmap import mmap
+from typing import Dict, Optional, Union
+
+# All arenas of the current process (inherited by the forked ones)
+_arenas: Dict[int, 'Arena'] = {}
+
+# Unique arenas' keys
+_keys = count()
+
+
+class Slice:
+    """
+    A handle of the payload stored in the arena. It's cheap to pickle and
+    can be read once in any process forked after the arena's creation.
+
+    Instance properties:
+        key: arena's key
+        slot: index of the arena's slot
+        length: payload's size in bytes
+        encoding: payload's text encoding
+    """
+    __slots__ = ('key', 'slot', 'length', 'encoding')
+
+    def __init__(self, key: int, slot: int, length: int, encoding: str):
+        self.key = key
+        self.slot = slot
+        self.length = length
+        self.encoding = encoding
+
+    def read(self) -> str:
+        """
+        Decodes the payload and frees the arena's slot.
+
+        :return: payload's text
+        """
+        return _arenas[self.key].read(self)
+
+
+class Arena:
+    """
+    Fixed-size slots' allocator upon a shared memory region. The region
+    starts with a header - one byte per slot marking whether it's busy or
+    not. The writer (event loop's process) marks the slot as busy and the
+    reader (any pool's process) marks it as free after the reading, so
+    no locks are needed. The lowest free slot is always taken, so only
+    the pages of the slots used at once are ever touched. If the payload's
+    too big or all slots are busy, the writer is suggested to transfer
+    the payload in a common way.
+
+    Class properties:
+        _slot_size: slot's capacity in bytes
+        _slots: default number of slots
+
+    Instance properties:
+        _slots: number of slots (the max number of payloads held at once)
+        _key: arena's key in the process' registry
+        _memory: shared memory mapping
+    """
+    _slot_size = 512 * 1024
+    _slots = 512
+
+    def __init__(self, slots: Optional[int] = None):
+        if slots is not None:
+            self._slots = slots
+        self._key = next(_keys)
+        self._memory = mmap(-1, self._slots + self._slots * self._slot_size)
+        _arenas[self._key] = self
+
+    def write(self, data: bytes, encoding: str) -> Optional[Slice]:
+        """
+        Copies the payload into the first free slot.
+
+        :param data: payload's bytes
+        :param encoding: payload's text encoding
+        :return: payload's handle or None if the payload doesn't fit
+        """
+        if len(data) > self._slot_size:
+            return None
+        slot = self._memory.find(b'\x00', 0, self._slots)
+        if slot == -1:
+            return None
+        self._memory[slot] = 1
+        offset = self.__offset(slot)
+        self._memory[offset:offset + len(data)] = data
+        return Slice(self._key, slot, len(data), encoding)
+
+    def read(self, piece: Slice) -> str:
+        """
+        Decodes the payload and frees its slot.
+
+        :param piece: payload's handle
+        :return: payload's text
+        """
+        offset = self.__offset(piece.slot)
+        try:
+            data = self._memory[offset:offset + piece.length]
+        finally:
+            self._memory[piece.slot] = 0
+        return data.decode(piece.encoding, 'replace')
+
+    def __offset(self, slot: int) -> int:
+        """
+        Calculates slot's position in the region.
+
+        :param slot: index of the slot
+        :return: slot's first byte position
+        """
+        return self._slots + slot * self._slot_size
+
+    def close(self):
+        """
+        Releases the shared memory region.
+        """
+        _arenas.pop(self._key, None)
+        self._memory.close()
+
+
+def unwrap(markup: Union[Slice, str, bytes]) -> Union[str, bytes]:
+    """
+    Resolves the markup if it was transferred via the arena.
+
+    :param markup: markup or its handle
+    :return: markup itself
+    """
+    return markup.read() if isinstance(markup, Slice) else markup
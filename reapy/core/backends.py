@@ -0,0 +1,175 @@
+"""
+This module describes parsers' backends - DOM builders
+
+A backend turns the markup into a tags' tree which supports the tiny
+subset of BeautifulSoup4's API used by the parsers (`find`, `find_all`,
+`findChild`, `text`, item access and `get`). BeautifulSoup4 is flexible
+but slow, so the native lxml backend supplies the same contract over
+the lxml's tree and precompiled XPath queries.
+"""
+from typing import Any, Dict, List, Optional, Tuple, Union
+from bs4 import BeautifulSoup
+from bs4.element import SoupStrainer
+from lxml.etree import HTML, HTMLParser, XPath, _Element  # noqa
+
+
+class Backend:
+    """
+    The most general DOM builder, which is chosen by the parser.
+    """
+    def build(
+        self,
+        markup: Union[str, bytes],
+        builder: str,
+        strainer: Optional[SoupStrainer] = None
+    ) -> Any:
+        """
+        Builds the tags' tree.
+
+        :param markup: HTML markup
+        :param builder: BeautifulSoup4's tree builder's name
+        :param strainer: if provided and supported, restricts tags' amount
+        :return: DOM tags' tree
+        """
+        pass
+
+
+class SoupBackend(Backend):
+    """
+    The default backend, which builds genuine BeautifulSoup4's trees.
+    """
+    def build(
+        self,
+        markup: Union[str, bytes],
+        builder: str,
+        strainer: Optional[SoupStrainer] = None
+    ) -> BeautifulSoup:
+        return BeautifulSoup(markup, builder, parse_only=strainer)
+
+
+class Node:
+    """
+    BeautifulSoup4-like view of the lxml's element. All queries are
+    translated into XPath expressions, which are compiled only once.
+
+    Class properties:
+        _queries: compiled XPath expressions by their search parameters
+        _text: string value's expression (text nodes only, like
+        BeautifulSoup4's `text` does)
+
+    Instance properties:
+        _element: lxml's element
+    """
+    __slots__ = ('_element',)
+    _queries: Dict[Tuple[Optional[str], ...], XPath] = {}
+    _text = XPath('string()')
+
+    def __init__(self, element: _Element):
+        self._element = element
+
+    @classmethod
+    def _query(
+        cls, name: Optional[str], class_: Optional[str], id: Optional[str]
+    ) -> XPath:
+        """
+        Compiles (or takes the cached) descendants' search expression. A
+        single CSS class matches any of the tag's classes, but several ones
+        must match the whole attribute as BeautifulSoup4 does.
+
+        :param name: tag's name
+        :param class_: tag's CSS class (or space-separated classes)
+        :param id: tag's id
+        :return: XPath expression
+        """
+        key = (name, class_, id)
+        query = cls._queries.get(key)
+        if query is None:
+            conditions = []
+            if class_ is not None:
+                conditions.append(
+                    f'normalize-space(@class) = "{class_}"' if ' ' in class_
+                    else 'contains(concat(" ", normalize-space(@class), " "), '
+                         f'" {class_} ")'
+                )
+            if id is not None:
+                conditions.append(f'@id = "{id}"')
+            query = cls._queries[key] = XPath(
+                f'.//{name or "*"}' + ''.join(f'[{c}]' for c in conditions)
+            )
+        return query
+
+    def find(
+        self,
+        name: Optional[str] = None,
+        class_: Optional[str] = None,
+        id: Optional[str] = None
+    ) -> Optional['Node']:
+        """
+        Finds the first matching descendant.
+
+        :param name: tag's name
+        :param class_: tag's CSS class
+        :param id: tag's id
+        :return: found node or None
+        """
+        elements = self._query(name, class_, id)(self._element)
+        return Node(elements[0]) if len(elements) > 0 else None
+
+    def find_all(
+        self,
+        name: Optional[str] = None,
+        class_: Optional[str] = None,
+        id: Optional[str] = None
+    ) -> List['Node']:
+        """
+        Finds all matching descendants in the document order.
+
+        :param name: tag's name
+        :param class_: tag's CSS class
+        :param id: tag's id
+        :return: found nodes
+        """
+        return [Node(e) for e in self._query(name, class_, id)(self._element)]
+
+    def findChild(self) -> Optional['Node']:
+        """
+        Finds the first child tag.
+
+        :return: found node or None
+        """
+        return self.find()
+
+    @property
+    def text(self) -> str:
+        return str(self._text(self._element))
+
+    def __getitem__(self, key: str) -> str:
+        value = self._element.get(key)
+        if value is None:
+            raise KeyError(key)
+        return value
+
+    def get(self, key: str, default: Any = None) -> Any:
+        return self._element.get(key, default)
+
+
+class LxmlBackend(Backend):
+    """
+    Native lxml backend. It ignores strainers, since the lxml's tree
+    building is cheap enough.
+
+    Class properties:
+        _parser: lxml's HTML parser
+    """
+    _parser = HTMLParser()
+
+    def build(
+        self,
+        markup: Union[str, bytes],
+        builder: str,
+        strainer: Optional[SoupStrainer] = None
+    ) -> Node:
+        if not isinstance(markup, (str, bytes)):
+            raise TypeError(f'markup must be a string, not {type(markup)}')
+        element = HTML(markup, self._parser)
+        return Node(HTML('<html/>') if element is None else element)
@@ -0,0 +1,282 @@
+"""
+This module describes caches - workers' local memory
+
+Most of the offers don't change between two reapers' runs, so there's
+no need to download and parse them again. An HTTP cache keeps response
+bodies with their validators (ETag & Last-Modified) and digests; the
+crawler sends conditional requests and recognizes unchanged pages either
+by the "304 Not Modified" status or by the same body's digest. Similarly,
+a geocoding cache keeps GIS API's answers, since many offers share the
+same addresses and points.
+"""
+from hashlib import sha1
+from json import dumps, loads
+from sqlite3 import connect, Connection
+from time import time
+from typing import Any, Dict, List, Optional, Tuple
+from zlib import compress, decompress
+from os.path import join
+from core import BASE_DIR
+
+
+class Entry:
+    """
+    Cached HTTP response.
+
+    Instance properties:
+        body: response body's bytes
+        encoding: body's text encoding
+        etag: response's ETag header
+        modified: response's Last-Modified header
+        digest: body's SHA-1 digest
+    """
+    __slots__ = ('body', 'encoding', 'etag', 'modified', 'digest')
+
+    def __init__(
+        self,
+        body: bytes,
+        encoding: str,
+        etag: Optional[str],
+        modified: Optional[str],
+        digest: str
+    ):
+        self.body = body
+        self.encoding = encoding
+        self.etag = etag
+        self.modified = modified
+        self.digest = digest
+
+    @property
+    def validators(self) -> Dict[str, str]:
+        """
+        Builds conditional request's headers.
+
+        :return: If-None-Match and/or If-Modified-Since headers
+        """
+        headers = {}
+        if self.etag is not None:
+            headers['If-None-Match'] = self.etag
+        if self.modified is not None:
+            headers['If-Modified-Since'] = self.modified
+        return headers
+
+
+class Cache:
+    """
+    The most general SQLite store which lives in a local file and is
+    shared by the processes. Expired entries are evicted on closing.
+
+    Class properties:
+        _schema: tables' (and indices') creation statements
+
+    Instance properties:
+        _path: absolute database file's path
+        _connection: SQLite connection
+    """
+    _schema = None
+
+    def __init__(self, path: str):
+        self._path = join(BASE_DIR, path)
+        self._connection: Optional[Connection] = None
+
+    def open(self):
+        """
+        Connects to the store and creates its tables if they're absent.
+        """
+        self._connection = connect(self._path, isolation_level=None)
+        self._connection.execute('PRAGMA journal_mode = WAL')
+        self._connection.executescript(self._schema)
+
+    def close(self):
+        """
+        Evicts expired entries and disconnects from the store.
+        """
+        self._evict()
+        self._connection.close()
+
+    def _evict(self):
+        """
+        Deletes expired entries.
+        """
+        pass
+
+
+class HttpCache(Cache):
+    """
+    SQLite store of the compressed response bodies keyed by their URLs.
+    Revalidation doesn't prolong entry's lifetime and entries older than
+    the max age are evicted, so every page is fully processed from time
+    to time even if it's never changed. A response may be stored as
+    pending: it's invisible until it's confirmed (e.g. after its offer's
+    storing) and it's evicted if it's never confirmed.
+
+    Class properties:
+        _max_age: entry's lifetime in seconds
+    """
+    _schema = '''
+        CREATE TABLE IF NOT EXISTS responses (
+            url TEXT PRIMARY KEY, body BLOB, encoding TEXT,
+            etag TEXT, modified TEXT, digest TEXT, stored REAL
+        )
+    '''
+    _max_age = 24 * 60 * 60
+
+    def get(self, url: str) -> Optional[Entry]:
+        """
+        Finds URL's cached response if it isn't expired.
+
+        :param url: request's URL
+        :return: cached response or None
+        """
+        row = self._connection.execute(
+            '''
+            SELECT body, encoding, etag, modified, digest FROM responses
+            WHERE url = ? AND stored > ?
+            ''',
+            (url, time() - self._max_age)
+        ).fetchone()
+        if row is not None:
+            return Entry(decompress(row[0]), *row[1:])
+
+    @staticmethod
+    def digest(body: bytes) -> str:
+        """
+        Calculates body's digest.
+
+        :param body: response body's bytes
+        :return: hexadecimal SHA-1 digest
+        """
+        return sha1(body).hexdigest()
+
+    def put(
+        self,
+        url: str,
+        body: bytes,
+        encoding: str,
+        etag: Optional[str],
+        modified: Optional[str],
+        pending: bool = False
+    ):
+        """
+        Stores (or replaces) URL's response.
+
+        :param url: request's URL
+        :param body: response body's bytes
+        :param encoding: body's text encoding
+        :param etag: response's ETag header
+        :param modified: response's Last-Modified header
+        :param pending: whether the response is hidden until its
+        confirmation or not
+        """
+        self._connection.execute(
+            '''
+            INSERT OR REPLACE INTO responses (
+                url, body, encoding, etag, modified, digest, stored
+            ) VALUES (?, ?, ?, ?, ?, ?, ?)
+            ''',
+            (
+                url, compress(body), encoding, etag,
+                modified, self.digest(body), None if pending else time()
+            )
+        )
+
+    def confirm(self, urls: List[str]):
+        """
+        Makes URLs' pending responses visible.
+
+        :param urls: requests' URLs
+        """
+        self._connection.execute(
+            f'''
+            UPDATE responses SET stored = ?
+            WHERE stored IS NULL AND url IN ({', '.join('?' * len(urls))})
+            ''',
+            (time(), *urls)
+        )
+
+    def _evict(self):
+        self._connection.execute(
+            'DELETE FROM responses WHERE stored IS NULL OR stored <= ?',
+            (time() - self._max_age,)
+        )
+
+
+class GeocodingCache(Cache):
+    """
+    SQLite store of the GIS API's locations keyed by normalized addresses
+    and rounded points. Negative results ("nothing found") are cached as
+    well, but live shorter.
+
+    Class properties:
+        _ttl: location's lifetime in seconds
+        _negative_ttl: negative result's lifetime in seconds
+        _precision: number of points' decimal digits (5 digits are ~1 m)
+    """
+    _schema = '''
+        CREATE TABLE IF NOT EXISTS locations (
+            key TEXT PRIMARY KEY, location TEXT, expires REAL
+        )
+    '''
+    _ttl = 30 * 24 * 60 * 60
+    _negative_ttl = 24 * 60 * 60
+    _precision = 5
+
+    def key(
+        self,
+        point: Optional[Tuple[float, float]] = None,
+        address: Optional[str] = None
+    ) -> str:
+        """
+        Builds the cache's key from the point or (if it's absent) from
+        the address. Address' case, extra spaces and empty parts are
+        ignored.
+
+        :param point: longitude & latitude
+        :param address: address string
+        :return: location's key
+        """
+        if point is not None:
+            return f'point:{point[0]:.{self._precision}f},' \
+                   f'{point[1]:.{self._precision}f}'
+        return 'address:' + ', '.join(filter(None, (
+            ' '.join(p.split()) for p in address.lower().split(',')
+        )))
+
+    def get(self, key: str) -> Tuple[bool, Optional[Dict[str, Any]]]:
+        """
+        Finds the location if it isn't expired.
+
+        :param key: location's key
+        :return: whether the key's found and its location (or None if
+        the location's absent)
+        """
+        row = self._connection.execute(
+            'SELECT location FROM locations WHERE key = ? AND expires > ?',
+            (key, time())
+        ).fetchone()
+        if row is None:
+            return False, None
+        return True, None if row[0] is None else loads(row[0])
+
+    def put(self, key: str, location: Optional[Dict[str, Any]]):
+        """
+        Stores (or replaces) the location.
+
+        :param key: location's key
+        :param location: GIS API's location or None if nothing's found
+        """
+        self._connection.execute(
+            '''
+            INSERT OR REPLACE INTO locations (key, location, expires)
+            VALUES (?, ?, ?)
+            ''',
+            (
+                key, None if location is None else dumps(location),
+                time() + (self._negative_ttl if location is None else self._ttl)
+            )
+        )
+
+    def _evict(self):
+        self._connection.execute(
+            'DELETE FROM locations WHERE expires <= ?', (time(),)
+        )
@@ -1,14 +1,55 @@
+from concurrent.futures import Executor
 from concurrent.futures.process import ProcessPoolExecutor
-from asyncio import Queue, gather, get_event_loop
-from typing import Callable, Generator, Iterable, List, Any, ValuesView
+from asyncio import Queue, QueueEmpty, gather, get_event_loop, ensure_future
+from typing import (
+    Callable, Generator, Iterable, List, Any, ValuesView, AsyncIterable,
+    AsyncIterator, Optional, Union
+)
 from core.utils import notnull, filter_map
 
 
+def _apply(function: Callable, values: List[Any]) -> List[Any]:
+    """
+    Maps the whole batch inside an executor's process, so a single task
+    (and a single pickling of the function) serves many values.
+
+    :param function: synchronous function-converter
+    :param values: batch of values to be converted
+    :return: converted values in the same order
+    """
+    return [function(v) for v in values]
+
+
 class Clix:
-    def __init__(self, creator: Callable):
+    """
+    Chainable pipeline of asynchronous & CPU bound stages. CPU bound stages
+    (`map` & `sieve`) are executed in a process pool in batches.
+
+    Class properties:
+        _batch_size: default number of values sent to the executor at once
+
+    Instance properties:
+        _creator: coroutine function which supplies the initial values
+        _queue: pipeline's stages
+        _executor: CPU bound stages' process pool
+        _owned: whether the executor is created (and shut down) by the clix
+        _batch_size: number of values sent to the executor at once
+        _loop: asyncio event loop
+    """
+    _batch_size = 8
+
+    def __init__(
+        self,
+        creator: Callable,
+        executor: Optional[Executor] = None,
+        batch_size: Optional[int] = None
+    ):
         self._creator = creator
         self._queue = Queue()
-        self._executor = ProcessPoolExecutor()
+        self._owned = executor is None
+        self._executor = ProcessPoolExecutor() if self._owned else executor
+        if batch_size is not None:
+            self._batch_size = batch_size
         self._loop = None
 
     def reform(self, mapper: Callable, predicate: Callable = notnull) -> 'Clix':
@@ -18,12 +59,18 @@ class Clix:
         return self
 
     def map(self, mapper: Callable) -> 'Clix':
-        self._queue.put_nowait(
-            lambda iterable: gather(*(self.__execute(mapper, i) for i in iterable))
-        )
+        self._queue.put_nowait(lambda iterable: self.__map(iterable, mapper))
         return self
 
-    def __execute(self, function: Callable, *args: Any) -> Generator:
+    async def __map(self, iterable: Iterable, mapper: Callable) -> List[Any]:
+        values, size = list(iterable), self._batch_size
+        batches = await gather(*(
+            self._execute(_apply, mapper, values[i:i + size])
+            for i in range(0, len(values), size)
+        ))
+        return [v for b in batches for v in b]
+
+    def _execute(self, function: Callable, *args: Any) -> Generator:
         return self._loop.run_in_executor(self._executor, function, *args)
 
     def flatten(self, flattener: Callable = (lambda v: v)) -> 'Clix':
@@ -42,8 +89,25 @@ class Clix:
     async def __distinct(iterable: Iterable, keymaker: Callable) -> ValuesView:
         return {keymaker(i): i for i in iterable}.values()
 
+    def chunk(self, size: int) -> 'Clix':
+        self._queue.put_nowait(lambda iterable: self.__chunk(iterable, size))
+        return self
+
+    @staticmethod
+    async def __chunk(iterable: Iterable, size: int) -> List[List[Any]]:
+        values = list(iterable)
+        return [values[i:i + size] for i in range(0, len(values), size)]
+
     def sieve(self, mapper: Callable, predicate: Callable = notnull) -> 'Clix':
-        return self.reform(lambda i: self.__execute(mapper, i), predicate)
+        self._queue.put_nowait(
+            lambda iterable: self.__sieve(iterable, mapper, predicate)
+        )
+        return self
+
+    async def __sieve(
+        self, iterable: Iterable, mapper: Callable, predicate: Callable
+    ) -> Iterable:
+        return filter(predicate, await self.__map(iterable, mapper))
 
     async def apply(self, applier: Callable) -> Iterable:
         self._loop = get_event_loop()
@@ -52,9 +116,16 @@ class Clix:
             function = await self._queue.get()
             iterable = await function(iterable)
         iterable = await gather(*(map(applier, iterable)))
-        self._executor.shutdown()
+        self._shutdown()
         return iterable
 
+    def _shutdown(self):
+        """
+        Releases the process pool if it isn't shared with others.
+        """
+        if self._owned:
+            self._executor.shutdown()
+
     async def list(self) -> List[Any]:
         iterable = await self.apply(self.__skip)
         return list(iterable)
@@ -62,3 +133,274 @@ class Clix:
     @staticmethod
     async def __skip(value: Any) -> Any:
         return value
+
+
+class _Failure:
+    """
+    Carries an exception raised inside a stage's task up to the consumer.
+    """
+    __slots__ = ('error',)
+
+    def __init__(self, error: Exception):
+        self.error = error
+
+
+_END = object()
+
+
+class StreamingClix(Clix):
+    """
+    Lazy Clix's counterpart: stages don't wait for the whole previous stage
+    to be gathered, values flow through them one by one. Every mapping stage
+    is served by a fixed number of tasks connected to the neighbours via
+    bounded queues, so the amount of values held at once depends only on
+    the buffer size and concurrency, but not on the input's length. The
+    creator may supply an asynchronous iterable (e.g. a DB cursor) as well.
+    The output order isn't preserved.
+
+    Class properties:
+        _buffer_size: default capacity of each stage's queues
+        _concurrency: default number of tasks serving each mapping stage
+
+    Instance properties:
+        _buffer_size: capacity of each stage's queues
+        _concurrency: number of tasks serving each mapping stage
+    """
+    _buffer_size = 200
+    _concurrency = 200
+
+    def __init__(
+        self,
+        creator: Callable,
+        executor: Optional[Executor] = None,
+        batch_size: Optional[int] = None,
+        buffer_size: Optional[int] = None,
+        concurrency: Optional[int] = None
+    ):
+        super().__init__(creator, executor, batch_size)
+        if buffer_size is not None:
+            self._buffer_size = buffer_size
+        if concurrency is not None:
+            self._concurrency = concurrency
+
+    @classmethod
+    def capacity(cls) -> int:
+        """
+        Estimates how many values of a mapping stage's product may be held
+        at once by default until a CPU bound stage consumes them: the
+        producing tasks' values, both queues between the stages, the value
+        moved between the queues and the consuming tasks' batches.
+
+        :return: the max number of values held between two stages
+        """
+        return (
+            cls._concurrency + 2 * cls._buffer_size + 1 +
+            cls._concurrency * cls._batch_size
+        )
+
+    def reform(
+        self, mapper: Callable, predicate: Callable = notnull
+    ) -> 'StreamingClix':
+        self._queue.put_nowait(
+            lambda iterator: self.__pipe(iterator, mapper, predicate)
+        )
+        return self
+
+    def map(self, mapper: Callable) -> 'StreamingClix':
+        return self.sieve(mapper, self.__pass)
+
+    def sieve(
+        self, mapper: Callable, predicate: Callable = notnull
+    ) -> 'StreamingClix':
+        self._queue.put_nowait(lambda iterator: self.__pipe(
+            iterator, lambda b: self._execute(_apply, mapper, b),
+            predicate, self._batch_size
+        ))
+        return self
+
+    def flatten(self, flattener: Callable = (lambda v: v)) -> 'StreamingClix':
+        self._queue.put_nowait(
+            lambda iterator: self.__flatten(iterator, flattener)
+        )
+        return self
+
+    @staticmethod
+    async def __flatten(
+        iterator: AsyncIterator, flattener: Callable
+    ) -> AsyncIterator:
+        async for value in iterator:
+            for item in flattener(value):
+                yield item
+
+    def distinct(self, keymaker: Callable) -> 'StreamingClix':
+        self._queue.put_nowait(
+            lambda iterator: self.__distinct(iterator, keymaker)
+        )
+        return self
+
+    @staticmethod
+    async def __distinct(
+        iterator: AsyncIterator, keymaker: Callable
+    ) -> AsyncIterator:
+        keys = set()
+        async for value in iterator:
+            key = keymaker(value)
+            if key not in keys:
+                keys.add(key)
+                yield value
+
+    def chunk(self, size: int) -> 'StreamingClix':
+        self._queue.put_nowait(lambda iterator: self.__chunk(iterator, size))
+        return self
+
+    @staticmethod
+    async def __chunk(iterator: AsyncIterator, size: int) -> AsyncIterator:
+        chunk = []
+        async for value in iterator:
+            chunk.append(value)
+            if len(chunk) == size:
+                yield chunk
+                chunk = []
+        if len(chunk) > 0:
+            yield chunk
+
+    async def apply(self, applier: Callable) -> Iterable:
+        self._loop = get_event_loop()
+        iterator = self.__iterate(await self._creator())
+        while not self._queue.empty():
+            iterator = self._queue.get_nowait()(iterator)
+        try:
+            return [v async for v in self.__pipe(iterator, applier, self.__pass)]
+        finally:
+            self._shutdown()
+
+    @staticmethod
+    async def __iterate(
+        iterable: Union[Iterable, AsyncIterable]
+    ) -> AsyncIterator:
+        if hasattr(iterable, '__aiter__'):
+            async for value in iterable:
+                yield value
+        else:
+            for value in iterable:
+                yield value
+
+    async def __pipe(
+        self,
+        iterator: AsyncIterator,
+        mapper: Callable,
+        predicate: Callable,
+        batch_size: Optional[int] = None
+    ) -> AsyncIterator:
+        """
+        Maps & filters the stream with a bounded set of tasks.
+
+        :param iterator: previous stage's stream
+        :param mapper: asynchronous function-converter
+        :param predicate: synchronous filtering function
+        :param batch_size: if provided, mapper converts lists of values
+        (up to this size) instead of single ones
+        :return: mapped & filtered stream
+        """
+        inbox, outbox = Queue(self._buffer_size), Queue(self._buffer_size)
+        tasks = [ensure_future(self.__feed(iterator, inbox, outbox))]
+        tasks.extend(
+            ensure_future(
+                self.__work(inbox, outbox, mapper, predicate, batch_size)
+            )
+            for _ in range(self._concurrency)
+        )
+        try:
+            remaining = self._concurrency
+            while remaining > 0:
+                value = await outbox.get()
+                if value is _END:
+                    remaining -= 1
+                elif isinstance(value, _Failure):
+                    raise value.error
+                else:
+                    yield value
+        finally:
+            for task in tasks:
+                task.cancel()
+
+    async def __feed(self, iterator: AsyncIterator, inbox: Queue, outbox: Queue):
+        """
+        Moves previous stage's values into the stage's input queue.
+
+        :param iterator: previous stage's stream
+        :param inbox: stage's input queue
+        :param outbox: stage's output queue (receives upstream failures)
+        """
+        try:
+            async for value in iterator:
+                await inbox.put(value)
+        except Exception as e:
+            await outbox.put(_Failure(e))
+            return
+        for _ in range(self._concurrency):
+            await inbox.put(_END)
+
+    @staticmethod
+    async def __work(
+        inbox: Queue,
+        outbox: Queue,
+        mapper: Callable,
+        predicate: Callable,
+        batch_size: Optional[int]
+    ):
+        """
+        Serves the stage: maps input values until the stream's end. In a
+        batch mode the task takes all values which are ready (up to the
+        batch's size) and converts them at once.
+
+        :param inbox: stage's input queue
+        :param outbox: stage's output queue
+        :param mapper: asynchronous function-converter
+        :param predicate: synchronous filtering function
+        :param batch_size: max batch's size or None in a single value mode
+        """
+        while True:
+            value = await inbox.get()
+            if value is _END:
+                break
+            try:
+                if batch_size is None:
+                    values = [await mapper(value)]
+                else:
+                    values = await mapper(
+                        StreamingClix.__drain(inbox, [value], batch_size)
+                    )
+                passed = [v for v in values if predicate(v)]
+            except Exception as e:
+                await outbox.put(_Failure(e))
+                return
+            for value in passed:
+                await outbox.put(value)
+        await outbox.put(_END)
+
+    @staticmethod
+    def __drain(inbox: Queue, batch: List[Any], batch_size: int) -> List[Any]:
+        """
+        Fills the batch with the values which are already in the queue.
+        The stream's end mark is returned back for the sake of other tasks.
+
+        :param inbox: stage's input queue
+        :param batch: batch with the first value
+        :param batch_size: max batch's size
+        :return: filled batch
+        """
+        while len(batch) < batch_size:
+            try:
+                value = inbox.get_nowait()
+            except QueueEmpty:
+                break
+            if value is _END:
+                inbox.put_nowait(value)
+                break
+            batch.append(value)
+        return batch
+
+    @staticmethod
+    def __pass(value: Any) -> bool:
+        return True
@@ -9,6 +9,7 @@ from datetime import date
 from decimal import Decimal
 from typing import Dict, Tuple, Optional
 from core.crawlers import Crawler
+from core.limiters import TokenBucket
 from core.utils import decimalize
 
 
@@ -24,6 +25,9 @@ class Converter:
         _symbols: complete dictionary of the currency chars
         _shaft_class: an inner class, which wraps all
         synchronous calculations (to be able to call them in the executor)
+        _rate: max number of the API requests per second
+        _bucket_path: rate limiter's state relative path (if provided,
+        the rate is shared by all the host's converters)
 
     Instance properties:
         _crawler: asynchronous HTTP client
@@ -31,16 +35,23 @@ class Converter:
         _loop: asyncio event loop
         _pairs: currency pairs' ratios
         _shaft: synchronous functions' wrapper
+        _bucket: host-wide rate limiter or None
     """
     _rates_url = None
     _symbols = {
         'грн.': 'UAH', '$': 'USD', '€': 'EUR',
         'USD': 'USD', 'UAH': 'UAH', 'EUR': 'EUR'
     }
+    _rate = 1
+    _bucket_path = None
 
     def __init__(self, crawler: Crawler):
         self._crawler = crawler
         self._pairs = None
+        self._bucket = (
+            None if self._bucket_path is None
+            else TokenBucket(self._bucket_path, self._rate)
+        )
 
     async def prepare(self):
         """
@@ -89,12 +100,13 @@ class NBUConverter(Converter):
     """
     _rates_url = 'https://bank.gov.ua/NBUStatService/v1/' \
                  'statdirectory/exchange?date={}&json'
+    _bucket_path = 'resources/nbu.bucket'
 
     async def _calc_pairs(self) -> Dict[Tuple[str, str], Decimal]:
         today = date.today()
         rates = await self._crawler.get_json(self._rates_url.format(
             f'{today.year}{self.__str(today.month)}{self.__str(today.day)}'
-        ))
+        ), bucket=self._bucket)
         if rates is None:
             return {}
         shapes = {r['cc']: r['rate'] for r in rates}
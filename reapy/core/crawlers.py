@@ -5,10 +5,27 @@ Crawlers are very useful abstraction layer upon `aiohttp.ClientSession` -
 they cover this connection pool, supplying convenient API for HTTP requests.
 Each crawler has a specific set of parameters, suitable for the target site.
 """
-from asyncio import Semaphore
-from typing import Dict, Union, List, Any
-from aiohttp.client import ClientSession
+from asyncio import Future, TimeoutError, ensure_future, get_event_loop, shield
+from concurrent.futures.thread import ThreadPoolExecutor
+from datetime import datetime, timezone
+from functools import partial
+from logging import getLogger
+from random import uniform
+from time import monotonic
+from typing import (
+    Dict, Union, List, Any, AsyncIterator, Callable, Iterable, Tuple, Optional
+)
+from aiohttp.client import ClientSession, ClientResponse
+from aiohttp.client_exceptions import ClientConnectionError, ClientResponseError
+from core.archives import MarkupArchive
+from core.arenas import Arena
+from core.caches import Entry, HttpCache
+from core.clixes import StreamingClix
 from core.decorators import networking
+from core.limiters import AdaptiveLimiter, overloaded
+from core.scribblers import Scribbler
+
+logger = getLogger(__name__)
 
 
 class Crawler:
@@ -20,26 +37,67 @@ class Crawler:
     the Internet.
 
     Class properties:
-        _limit: the max number of concurrent connections to the same site
+        _limit: the initial number of concurrent connections to the same site
+        _max_limit: the max number of concurrent connections to the same site
         _timeout: default HTTP request timeout
+        _slowness: share of the timeout; slower requests mean the site's
+        congestion
+        _cache_class: HTTP cache's class
+        _cache_path: HTTP cache's relative path (if provided, text & body
+        requests are conditional and their responses are cached)
+        _attempts: the max number of attempts of a single request
+        _backoff: base delay (in seconds) of the exponential backoff
+        _max_backoff: the max delay (in seconds) between the attempts
+        _retry_budget: the max number of retries per run
 
     Instance properties:
         _session: HTTP connection pool
         _scribbler: statistics entity which writes success & failure shapes
-        _semaphore: HTTP connection "restriction frame"
+        _limiter: HTTP connection "restriction frame", which adapts to
+        the site's capacity
+        _cache: HTTP cache or None
+        _io: single thread which runs the cache's blocking calls
+        (compression & SQLite queries) off the event loop
+        _pending: URLs of the responses cached as pending during the run
+        _retries: remaining retry budget
+        _flights: in-flight requests by their kinds, URLs & options
+        _memo: per-run JSON responses by their URLs & options
     """
     _limit = 10
+    _max_limit = 20
     _timeout = 1
+    _slowness = 0.5
+    _cache_class = HttpCache
+    _cache_path = None
+    _attempts = 3
+    _backoff = 0.5
+    _max_backoff = 8
+    _retry_budget = 200
 
-    def __init__(self):
+    def __init__(self, scribbler: Optional[Scribbler] = None):
         self._session = None
-        self._semaphore = Semaphore(self._limit)
+        self._scribbler = scribbler
+        self._limiter = AdaptiveLimiter(
+            self._limit, self._max_limit, self._timeout * self._slowness
+        )
+        self._cache = (
+            None if self._cache_path is None
+            else self._cache_class(self._cache_path)
+        )
+        self._io = None
+        self._pending = set()
+        self._retries = self._retry_budget
+        self._flights: Dict[Tuple, Future] = {}
+        self._memo: Dict[Tuple, Any] = {}
 
     async def prepare(self):
         """
-        Acquires HTTP connection pool.
+        Acquires HTTP connection pool and opens the cache.
         """
         self._session = ClientSession()
+        if self._cache is not None:
+            self._io = ThreadPoolExecutor(1)
+            await self._run_io(self._cache.open)
 
     async def get_json(self, url: str, **kwargs: Any) -> Union[List, Dict]:
         """
@@ -47,26 +105,144 @@ class Crawler:
 
         :param url: request's URL
         :param kwargs: additional config like timeout, content-type, etc.
-        :return: JSON content via native python objects
+        :return: JSON content via native python objects (shared by all
+        requesters of the URL during the run, so it mustn't be modified)
+        """
+        key = self.__key('json', url, kwargs)
+        json = None if key is None else self._memo.get(key)
+        if json is None:
+            json = await self.__fetch('json', url, ClientResponse.json, **kwargs)
+            if json is not None and key is not None:
+                self._memo[key] = json
+        return json
+
+    @staticmethod
+    def __key(kind: str, url: str, kwargs: Dict[str, Any]) -> Optional[Tuple]:
+        """
+        Builds request's identity: its content's kind, URL and options
+        (headers, timeout, semaphore, bucket, etc.).
+
+        :param kind: content's kind (JSON, text, etc.)
+        :param url: request's URL
+        :param kwargs: additional config like timeout, content-type, etc.
+        :return: hashable request's key or None if some option isn't hashable
+        """
+        key = (kind, url, tuple(sorted(
+            (n, tuple(sorted(v.items())) if isinstance(v, dict) else v)
+            for n, v in kwargs.items()
+        )))
+        try:
+            hash(key)
+        except TypeError:
+            return None
+        return key
+
+    async def __fetch(
+        self, kind: str, url: str, reader: Callable, **kwargs: Any
+    ) -> Any:
         """
-        return await self.__get_content(url, 'json', **kwargs)
+        Coalesces concurrent identical requests (the same kind, URL and
+        options): the first one goes to the network and the rest wait for
+        its content.
+
+        :param kind: content's kind (JSON, text, etc.)
+        :param url: request's URL
+        :param reader: response's coroutine which extracts the content
+        :param kwargs: additional config like timeout, content-type, etc.
+        :return: response's content
+        """
+        key = self.__key(kind, url, kwargs)
+        if key is None:
+            return await self.__get_content(url, reader, **kwargs)
+        flight = self._flights.get(key)
+        if flight is None:
+            flight = self._flights[key] = ensure_future(
+                self.__get_content(url, reader, **kwargs)
+            )
+            flight.add_done_callback(lambda _: self._flights.pop(key, None))
+        return await shield(flight)
 
     @networking
     async def __get_content(
-        self, url: str, content_type: str, **kwargs: Any
+        self, url: str, reader: Callable, **kwargs: Any
     ) -> Any:
         """
         Makes an HTTP request and returns response in a specified format.
 
         :param url: request's URL
-        :param content_type: response's data type, like JSON, text, etc.
+        :param reader: response's coroutine which extracts the content
+        (JSON, text, etc.)
         :param kwargs: additional config like timeout, content-type, etc.
+        (`semaphore` replaces the crawler's limiter and `bucket` restricts
+        the rate of the attempts)
         :return: response's content
         """
         kwargs['timeout'] = kwargs.get('timeout', self._timeout)
-        async with kwargs.pop('semaphore', self._semaphore):
-            async with self._session.get(url, **kwargs) as response:
-                return await getattr(response, content_type)()
+        limiter = kwargs.pop('semaphore', self._limiter)
+        bucket = kwargs.pop('bucket', None)
+        async with limiter:
+            if bucket is not None:
+                await bucket.acquire()
+            start = monotonic()
+            try:
+                async with self._session.get(url, **kwargs) as response:
+                    if overloaded(response.status):
+                        response.raise_for_status()
+                    content = await reader(response)
+            except (TimeoutError, ClientConnectionError):
+                self.__feed(limiter)
+                raise
+            except ClientResponseError as e:
+                if overloaded(e.status):
+                    self.__feed(limiter)
+                raise
+            self.__feed(limiter, monotonic() - start)
+            return content
+
+    def __feed(self, limiter: Any, latency: Optional[float] = None):
+        """
+        Reports request's outcome to the crawler's own limiter (other
+        restriction frames aren't adaptive).
+
+        :param limiter: request's restriction frame
+        :param latency: request's duration or None if the site's congested
+        """
+        if limiter is self._limiter:
+            if latency is None:
+                self._limiter.fail()
+            else:
+                self._limiter.succeed(latency)
+
+    def _retry(self, attempt: int) -> bool:
+        """
+        Decides whether the failed request should be retried and spends
+        the retry budget.
+
+        :param attempt: index of the failed attempt (starting from 0)
+        :return: should the request be repeated or not
+        """
+        if attempt + 1 >= self._attempts or self._retries <= 0:
+            return False
+        self._retries -= 1
+        return True
+
+    def _delay(self, attempt: int) -> float:
+        """
+        Calculates the jittered exponential backoff before the retry.
+
+        :param attempt: index of the next attempt (starting from 1)
+        :return: delay in seconds
+        """
+        return uniform(0, min(self._max_backoff, self._backoff * 2 ** attempt))
+
+    async def _scribble(self, field: str):
+        """
+        Reports crawler's shape to the scribbler if it's provided.
+
+        :param field: scribbler's numeric field
+        """
+        if self._scribbler is not None:
+            await self._scribbler.add(field)
 
     async def get_text(self, url: str, **kwargs: Any) -> str:
         """
@@ -76,17 +252,179 @@ class Crawler:
         :param kwargs: additional config like timeout, content-type, etc.
         :return: HTML file's markup
         """
-        return await self.__get_content(url, 'text', **kwargs)
+        if self._cache is None:
+            return await self.__fetch('text', url, ClientResponse.text, **kwargs)
+        body = await self.revalidate(url, **kwargs)
+        if body is not None:
+            return body[0].decode(body[1], 'replace')
+
+    async def get_body(
+        self, url: str, cached: bool = True, **kwargs: Any
+    ) -> Optional[Tuple[bytes, str]]:
+        """
+        Makes an HTTP request and returns raw response's body, avoiding
+        the decoding.
+
+        :param url: request's URL
+        :param cached: whether the request's revalidated against the cache
+        (if any) or it neither reads nor writes the cache
+        :param kwargs: additional config like timeout, content-type, etc.
+        :return: body's bytes and their encoding
+        """
+        if self._cache is None or not cached:
+            return await self.__fetch('body', url, self.__read_body, **kwargs)
+        body = await self.revalidate(url, **kwargs)
+        if body is not None:
+            return body[:2]
+
+    @staticmethod
+    async def __read_body(response: ClientResponse) -> Tuple[bytes, str]:
+        """
+        Reads response's body and detects its encoding.
+
+        :param response: HTTP response
+        :return: body's bytes and their encoding
+        """
+        return await response.read(), response.get_encoding()
+
+    async def revalidate(
+        self, url: str, pending: bool = False, **kwargs: Any
+    ) -> Optional[Tuple[bytes, str, bool]]:
+        """
+        Makes a conditional HTTP request (if the response is cached) and
+        returns raw response's body, telling whether it's changed since
+        the last caching or not.
+
+        :param url: request's URL
+        :param pending: whether a new response is cached as pending (it's
+        revalidated only after the confirmation) or not
+        :param kwargs: additional config like timeout, content-type, etc.
+        :return: body's bytes, their encoding and body's modification flag
+        """
+        if self._cache is None:
+            body = await self.get_body(url, **kwargs)
+            return None if body is None else (*body, True)
+        entry = await self._run_io(self._cache.get, url)
+        if entry is not None:
+            kwargs['headers'] = {**kwargs.get('headers', {}), **entry.validators}
+        return await self.__fetch(
+            'pending' if pending else 'cached', url,
+            partial(self.__read_cached, url, entry, pending), **kwargs
+        )
+
+    async def __read_cached(
+        self,
+        url: str,
+        entry: Optional[Entry],
+        pending: bool,
+        response: ClientResponse
+    ) -> Tuple[bytes, str, bool]:
+        """
+        Reads response's body or takes the cached one if the response
+        isn't modified; caches new successful responses.
+
+        :param url: request's URL
+        :param entry: cached response or None
+        :param pending: whether a new response is cached as pending or not
+        :param response: HTTP response
+        :return: body's bytes, their encoding and body's modification flag
+        """
+        if entry is not None and response.status == 304:
+            return entry.body, entry.encoding, False
+        body, encoding = await self.__read_body(response)
+        if entry is not None and entry.digest == self._cache.digest(body):
+            return body, encoding, False
+        if response.status == 200:
+            await self._run_io(
+                self._cache.put, url, body, encoding,
+                response.headers.get('ETag'),
+                response.headers.get('Last-Modified'), pending
+            )
+            if pending:
+                self._pending.add(url)
+        return body, encoding, True
+
+    async def confirm(self, urls: Iterable[str]):
+        """
+        Makes pending cached responses visible, so their pages are
+        revalidated since the next run.
+
+        :param urls: requests' URLs
+        """
+        confirmed = [u for u in urls if u in self._pending]
+        if len(confirmed) > 0:
+            self._pending.difference_update(confirmed)
+            await self._run_io(self._cache.confirm, confirmed)
+
+    def _run_io(self, function: Callable, *args: Any) -> Future:
+        """
+        Runs the cache's blocking call in the crawler's I/O thread.
+
+        :param function: blocking callable
+        :param args: callable's arguments
+        :return: call's future
+        """
+        return get_event_loop().run_in_executor(self._io, function, *args)
 
     async def spare(self):
         """
-        Releases HTTP connection pool.
+        Releases HTTP connection pool and closes the cache.
         """
+        logger.info(
+            f'{type(self).__name__} finished with {self._limiter.stats}, '
+            f'{self._retry_budget - self._retries} retries'
+        )
         await self._session.close()
+        if self._cache is not None:
+            await self._run_io(self._cache.close)
+            self._io.shutdown()
 
 
 class EstateCrawler(Crawler):
+    """
+    A crawler which fetches estate offers. Offer pages are big, so they're
+    written into the shared memory arena and only their handles are passed
+    further (to the parsers' processes). The arena holds as many pages as
+    the streaming pipeline may keep until the parsing stage reads them
+    (including the parsers' batches); further chunks hold parsed offers
+    only. Fetched offer pages may be kept in the markup archive to be
+    parsed again later.
+
+    Class properties:
+        _page_url: pagination page's URL template
+        _arena_class: shared memory allocator's class
+        _archive_class: markup archive's class
+        _archive_path: markup archive's relative folder path (if provided,
+        changed offer pages are archived)
+
+    Instance properties:
+        _arena: shared memory allocator (must be created before the
+        process pool)
+        _archive: markup archive or None
+        _archivist: single thread which runs the archive's blocking calls
+        (compression, segments' appends & SQLite queries) off the event loop
+        _visited: per-run URLs of the requested offers
+    """
     _page_url = None
+    _arena_class = Arena
+    _archive_class = MarkupArchive
+    _archive_path = None
+
+    def __init__(self, scribbler: Optional[Scribbler] = None):
+        super().__init__(scribbler)
+        self._arena = self._arena_class(StreamingClix.capacity())
+        self._archive = (
+            None if self._archive_path is None
+            else self._archive_class(self._archive_path)
+        )
+        self._archivist = None
+        self._visited = set()
+
+    async def prepare(self):
+        await super().prepare()
+        if self._archive is not None:
+            self._archivist = ThreadPoolExecutor(1)
+            await self._run_archive(self._archive.open)
 
     async def get_page(self, index: int) -> str:
         """
@@ -99,14 +437,100 @@ class EstateCrawler(Crawler):
 
     async def get_offer(self, form: Dict[str, Any]) -> Dict[str, Any]:
         """
-        Maps a "raw offer" form into a normal offer dict.
+        Maps a "raw offer" form into a normal offer dict. A new offer's
+        page is cached as pending, so it isn't skipped as unchanged until
+        the offer's storing is confirmed.
 
         :param form: "raw offer" dict
-        :return: the same dict with a 'markup' field if the request succeeded
+        :return: the same dict with a 'markup' field (either string or arena's
+        slice) if the request succeeded, the offer's changed since its
+        caching and it hasn't been requested during the run
         """
-        form['markup'] = await self.get_text(form['url'])
+        if form['url'] in self._visited:
+            form['markup'] = None
+            return form
+        self._visited.add(form['url'])
+        body = await self.revalidate(form['url'], True)
+        if body is None or not body[2]:
+            form['markup'] = None
+        else:
+            if self._archive is not None:
+                await self._run_archive(
+                    self._archive.put, form['url'], *body[:2],
+                    {k: v for k, v in form.items() if k not in ('url', 'markup')}
+                )
+            form['markup'] = self.__wrap(*body[:2])
         return form
 
+    async def get_markup(
+        self, form: Dict[str, Any], **kwargs: Any
+    ) -> Dict[str, Any]:
+        """
+        Maps a "raw offer" form into a normal offer dict regardless of the
+        offer's visiting (e.g. to check its obsolescence). The cache is
+        bypassed: the live page is judged, and the reaper's cache isn't
+        refreshed by someone else's responses.
+
+        :param form: "raw offer" dict
+        :param kwargs: additional config like timeout, content-type, etc.
+        :return: the same dict with a 'markup' field (either string, arena's
+        slice or None if the request failed)
+        """
+        body = await self.get_body(form['url'], False, **kwargs)
+        form['markup'] = None if body is None else self.__wrap(*body)
+        return form
+
+    def __wrap(self, body: bytes, encoding: str) -> Any:
+        """
+        Writes offer page into the arena (or decodes it if the arena's full).
+
+        :param body: page's bytes
+        :param encoding: body's text encoding
+        :return: arena's slice or markup string
+        """
+        piece = self._arena.write(body, encoding)
+        return body.decode(encoding, 'replace') if piece is None else piece
+
+    async def get_archived_offers(
+        self, since: float
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Replays offers from the markup archive instead of the site.
+
+        :param since: UNIX timestamp of the earliest fetch
+        :return: "raw offers" with 'markup' fields (either strings or
+        arena's slices) and 'observed' fields (fetches' moments)
+        """
+        if self._archive is None:
+            return
+        fetches = await self._run_archive(list, self._archive.fetches(since))
+        for url, digest, encoding, form, fetched in fetches:
+            body = await self._run_archive(self._archive.read, digest)
+            if body is not None:
+                yield {
+                    **form,
+                    'url': url,
+                    'observed': datetime.fromtimestamp(fetched, timezone.utc),
+                    'markup': self.__wrap(body, encoding)
+                }
+
+    def _run_archive(self, function: Callable, *args: Any) -> Future:
+        """
+        Runs the archive's blocking call in the crawler's archiving thread.
+
+        :param function: blocking callable
+        :param args: callable's arguments
+        :return: call's future
+        """
+        return get_event_loop().run_in_executor(self._archivist, function, *args)
+
+    async def spare(self):
+        await super().spare()
+        self._arena.close()
+        if self._archive is not None:
+            await self._run_archive(self._archive.close)
+            self._archivist.shutdown()
+
 
 class OlxFlatCrawler(EstateCrawler):
     """
@@ -114,7 +538,10 @@ class OlxFlatCrawler(EstateCrawler):
     """
     _page_url = 'https://www.olx.ua/nedvizhimost/kvartiry-' \
                 'komnaty/prodazha-kvartir-komnat/?page={}'
+    _cache_path = 'resources/olx_flat_reaper/cache.sqlite3'
+    _archive_path = 'resources/olx_flat_reaper/archive'
     _limit = 80
+    _max_limit = 240
     _timeout = 10
 
 
@@ -123,5 +550,8 @@ class DomRiaFlatCrawler(EstateCrawler):
     A crawler which searches flat offers from `www.olx.ua <https://dom.ria.com/>`_.
     """
     _page_url = 'https://dom.ria.com/uk/prodazha-kvartir/?page={}'
+    _cache_path = 'resources/dom_ria_flat_reaper/cache.sqlite3'
+    _archive_path = 'resources/dom_ria_flat_reaper/archive'
     _limit = 190
+    _max_limit = 380
     _timeout = 13
@@ -2,15 +2,16 @@
 *reapy*'s decorator collection for all occasions
 """
 from logging import getLogger
-from asyncio import TimeoutError
+from asyncio import TimeoutError, sleep
 from time import time
 from typing import Callable, Any
 from aiohttp import ContentTypeError
 from aiohttp.client import TooManyRedirects
 from asyncpg import UniqueViolationError, PostgresError
 from aiohttp.client_exceptions import (
-    ClientConnectorError, ClientPayloadError, ClientError
+    ClientConnectionError, ClientPayloadError, ClientError, ClientResponseError
 )
+from core.limiters import overloaded
 
 logger = getLogger(__name__)
 
@@ -36,24 +37,51 @@ def measurable(name: str) -> Callable:
 
 def networking(function: Callable) -> Callable:
     """
-    Handles web & networking errors.
+    Handles web & networking errors. Transient failures (timeouts,
+    connection errors and 429/5xx responses) are retried according to the
+    crawler's policy, that's why only idempotent (GET) requests may be
+    wrapped. Retries and final failures are reported to the crawler.
 
-    :param function: target callable
+    :param function: target crawler's method
     :return: wrapper with `aiohttp` errors' handling
     """
-    async def wrapper(url: str, *args: Any, **kwargs: Any) -> Any:
-        try:
-            return await function(url, *args, **kwargs)
-        except (
-            TimeoutError, TooManyRedirects, ContentTypeError,
-            ClientPayloadError, ClientConnectorError
-        ) as e:
-            logger.error(f'HTTP connection failed: {e}')
-        except ClientError:
-            logger.exception(f'{url} crawling failed')
+    async def wrapper(crawler: Any, url: str, *args: Any, **kwargs: Any) -> Any:
+        attempt = 0
+        while True:
+            try:
+                return await function(crawler, url, *args, **kwargs)
+            except (
+                TimeoutError, TooManyRedirects, ContentTypeError,
+                ClientPayloadError, ClientConnectionError, ClientResponseError
+            ) as e:
+                if not _transient(e) or not crawler._retry(attempt):  # noqa
+                    logger.error(f'HTTP connection to {url} failed: {e!r}')
+                    await crawler._scribble('failed')  # noqa
+                    return None
+            except ClientError:
+                logger.exception(f'{url} crawling failed')
+                await crawler._scribble('failed')  # noqa
+                return None
+            attempt += 1
+            await crawler._scribble('retried')  # noqa
+            await sleep(crawler._delay(attempt))  # noqa
     return wrapper
 
 
+def _transient(error: Exception) -> bool:
+    """
+    Checks whether the request's failure may disappear after a while.
+
+    :param error: request's failure
+    :return: is the error worth retrying
+    """
+    if isinstance(error, ClientResponseError):
+        return overloaded(error.status)
+    return isinstance(
+        error, (TimeoutError, ClientPayloadError, ClientConnectionError)
+    )
+
+
 def nullable(function: Callable) -> Callable:
     """
     Simple wrapper suitable for functions which
@@ -4,13 +4,21 @@ This module describes a bunch of "geographic" classes
 One of the most important step of the data flow is position determination.
 Objects are situated all over the territory and the service has to know
 their coordinates. The classes below use the public API to carry out
-geocoding & reversing.
+geocoding & reversing; reversing can also be done offline upon the local
+OSM extract stored in PostGIS.
 """
-from asyncio import Semaphore
-from typing import Dict, Any, Union, List, Tuple
+from asyncio import Future, Semaphore, get_event_loop
+from concurrent.futures.thread import ThreadPoolExecutor
+from logging import getLogger
+from typing import Dict, Any, Callable, Union, List, Tuple, Optional
+from asyncpg import PostgresError, create_pool
+from core.caches import GeocodingCache
 from core.crawlers import Crawler
+from core.limiters import TokenBucket
 from core.scribblers import Scribbler
 
+logger = getLogger(__name__)
+
 
 class Geolocator:
     """
@@ -24,36 +32,117 @@ class Geolocator:
         _limit: a number of concurrent HTTP requests to the API
         _timeout: default HTTP request timeout
         _headers: API request headers, like User-Agent, etc.
+        _cache_class: locations' cache class
+        _cache_path: locations' cache relative path (if provided, all
+        locations are cached between the runs)
+        _rate: max number of the API requests per second
+        _bucket_path: rate limiter's state relative path (if provided,
+        the rate is shared by all the host's geolocators)
 
     Instance properties:
         _scribbler: statistics entity which writes success & failure shapes
         _crawler: asynchronous HTTP client
         _semaphore: HTTP connection "restriction frame"
+        _cache: locations' cache or None
+        _io: single thread which runs the cache's blocking calls (SQLite
+        queries) off the event loop
+        _bucket: host-wide rate limiter or None
     """
     _geocoding_url = None
     _reversing_url = None
     _limit = 1
     _timeout = 4.5
     _headers = {'User-Agent': 'reapy/1.0'}
+    _cache_class = GeocodingCache
+    _cache_path = None
+    _rate = 1
+    _bucket_path = None
 
     def __init__(self, scribbler: Scribbler, crawler: Crawler):
         self._scribbler = scribbler
         self._crawler = crawler
         self._semaphore = Semaphore(self._limit)
+        self._cache = (
+            None if self._cache_path is None
+            else self._cache_class(self._cache_path)
+        )
+        self._io = None
+        self._bucket = (
+            None if self._bucket_path is None
+            else TokenBucket(self._bucket_path, self._rate)
+        )
+
+    async def prepare(self, dsn: str):
+        """
+        Opens the locations' cache and other geolocator's resources.
+
+        :param dsn: DB server's url
+        """
+        if self._cache is not None:
+            self._io = ThreadPoolExecutor(1)
+            await self._run_io(self._cache.open)
+
+    async def locate(self, geodict: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """
+        Finds the location by the point or (if it's absent) by the address,
+        consulting the cache before the API requests.
 
-    async def locate(self, geodict: Dict[str, Any]) -> Dict[str, Any]:
+        :param geodict: dictionary with either 'point' or 'address'
+        :return: GIS API's location or None
+        """
         point, address = geodict.get('point'), geodict.get('address')
-        location = await (
-            self._geocode(address) if point is None else self._reverse(point)
-        )
-        if location is None:
+        if self._cache is None:
+            location = await self.__request(point, address)
+        else:
+            key = self._cache.key(point, address)
+            found, location = await self._run_io(self._cache.get, key)
+            if found:
+                await self._scribbler.add('geocached')
+            else:
+                await self._scribbler.add('geocoded')
+                location = await self.__request(point, address)
+                if location is not None:
+                    await self._run_io(self._cache.put, key, location or None)
+        if not location:
             await self._scribbler.add('unlocated')
+            return None
         return location
 
-    async def _geocode(self, address: str) -> Dict[str, Any]:
+    async def __request(
+        self, point: Optional[Tuple[float, float]], address: Optional[str]
+    ) -> Optional[Dict[str, Any]]:
+        """
+        Requests the location from the API.
+
+        :param point: longitude & latitude
+        :param address: address string
+        :return: GIS API's location, an empty dict if nothing's found
+        or None if the request failed
+        """
+        return await (
+            self._geocode(address) if point is None else self._reverse(point)
+        )
+
+    async def _geocode(self, address: str) -> Optional[Dict[str, Any]]:
+        """
+        Performs geocoding: finds the address' location.
+
+        :param address: address string
+        :return: GIS API's location, an empty dict if nothing's found
+        or None if the request failed
+        """
         pass
 
-    async def _reverse(self, point: Tuple[float, float]) -> Dict[str, Any]:
+    async def _reverse(
+        self, point: Tuple[float, float]
+    ) -> Optional[Dict[str, Any]]:
+        """
+        Performs reversing: finds the point's location.
+
+        :param point: longitude & latitude
+        :return: GIS API's location, an empty dict if nothing's found
+        or None if the request failed
+        """
         pass
 
     async def _get_json(self, url: str) -> Union[List[Any], Dict[str, Any]]:
@@ -64,25 +153,171 @@ class Geolocator:
         :return: response's markup in JSON format
         """
         return await self._crawler.get_json(
-            url, semaphore=self._semaphore,
+            url, semaphore=self._semaphore, bucket=self._bucket,
             timeout=self._timeout, headers=self._headers
         )
 
+    def _run_io(self, function: Callable, *args: Any) -> Future:
+        """
+        Runs the cache's blocking call in the geolocator's I/O thread.
+
+        :param function: blocking callable
+        :param args: callable's arguments
+        :return: call's future
+        """
+        return get_event_loop().run_in_executor(self._io, function, *args)
+
+    async def spare(self):
+        """
+        Closes the locations' cache.
+        """
+        if self._cache is not None:
+            await self._run_io(self._cache.close)
+            self._io.shutdown()
+
 
 class NominatimGeolocator(Geolocator):
     """
     "Geographic class" which leverages Nominatim API (based on OSM).
     """
+    _cache_path = 'resources/nominatim.sqlite3'
+    _bucket_path = 'resources/nominatim.bucket'
     _geocoding_url = 'https://nominatim.openstreetmap.org/search' \
                      '?format=json&q={}&addressdetails=1&limit=1'
     _reversing_url = 'https://nominatim.openstreetmap.org/reverse' \
                      '?format=json&lat={}&lon={}&addressdetails=1'
 
-    async def _geocode(self, address: str) -> Dict[str, Any]:
+    async def _geocode(self, address: str) -> Optional[Dict[str, Any]]:
         json = await self._get_json(self._geocoding_url.format(address))
-        return None if json is None or len(json) == 0 else json[0]
+        if json is not None:
+            return json[0] if len(json) > 0 else {}
 
-    async def _reverse(self, point: Tuple[float, float]) -> Dict[str, Any]:
-        return await self._get_json(
+    async def _reverse(
+        self, point: Tuple[float, float]
+    ) -> Optional[Dict[str, Any]]:
+        json = await self._get_json(
             self._reversing_url.format(point[1], point[0])
         )
+        return {} if json is not None and 'error' in json else json
+
+
+class OsmGeolocator(NominatimGeolocator):
+    """
+    Nominatim's substitute whose reversing doesn't touch the network: it's
+    answered from the Ukrainian OSM extract loaded into `osm_boundaries`
+    (administrative polygons, point-in-polygon search) and `osm_roads`
+    (named ways, nearest neighbour search) tables. The result has the same
+    shape as Nominatim's one, so it's processed by the same geomapper.
+    Geocoding and reversing of the points outside the extract (or before
+    its loading by :class:`core.keepers.OsmKeeper`) are still performed via
+    Nominatim API. Locations are cached apart from Nominatim's ones, so
+    they can be told apart and dropped separately (e.g. after the extract's
+    reloading).
+
+    Class properties:
+        _country: the extract's country
+        _road_radius: max distance (in meters) to the estate's road
+        _max_pool_size: maximal number of concurrent DB connections
+        _name_lengths: max lengths of the names by their kinds (OSM names
+        are clipped to the geolocations' columns)
+
+    Instance properties:
+        _pool: low-level collection of DB connections
+    """
+    _cache_path = 'resources/osm.sqlite3'
+    _country = 'Україна'
+    _road_radius = 150
+    _max_pool_size = 5
+    _name_lengths = {
+        'state': 30, 'county': 40, 'locality': 40,
+        'neighbourhood': 90, 'road': 80
+    }
+
+    def __init__(self, scribbler: Scribbler, crawler: Crawler):
+        super().__init__(scribbler, crawler)
+        self._pool = None
+
+    async def prepare(self, dsn: str):
+        await super().prepare(dsn)
+        self._pool = await create_pool(dsn, max_size=self._max_pool_size)
+
+    async def _reverse(
+        self, point: Tuple[float, float]
+    ) -> Optional[Dict[str, Any]]:
+        try:
+            async with self._pool.acquire() as connection:
+                record = await connection.fetchrow(
+                    '''
+                    SELECT (
+                        SELECT name FROM osm_boundaries 
+                        WHERE kind = 'state' AND st_contains(geometry, p) 
+                        ORDER BY st_area(geometry) LIMIT 1
+                    ) AS state, (
+                        SELECT name FROM osm_boundaries 
+                        WHERE kind = 'county' AND st_contains(geometry, p) 
+                        ORDER BY st_area(geometry) LIMIT 1
+                    ) AS county, (
+                        SELECT name FROM osm_boundaries 
+                        WHERE kind = 'locality' AND st_contains(geometry, p) 
+                        ORDER BY st_area(geometry) LIMIT 1
+                    ) AS locality, (
+                        SELECT name FROM osm_boundaries 
+                        WHERE kind = 'neighbourhood' AND 
+                        st_contains(geometry, p) 
+                        ORDER BY st_area(geometry) LIMIT 1
+                    ) AS neighbourhood, (
+                        SELECT name FROM (
+                            SELECT name, geometry FROM osm_roads 
+                            ORDER BY geometry <-> p LIMIT 1
+                        ) AS r 
+                        WHERE st_dwithin(
+                            r.geometry::geography, p::geography, $3
+                        )
+                    ) AS road
+                    FROM (SELECT st_setsrid(st_point($1, $2), 4326) AS p) AS x
+                    ''',
+                    point[0], point[1], self._road_radius
+                )
+        except PostgresError:
+            logger.exception(f'{point} reversing failed')
+            return None
+        location = self._format(point, dict(record))
+        return location if location else await super()._reverse(point)
+
+    def _format(
+        self, point: Tuple[float, float], names: Dict[str, Optional[str]]
+    ) -> Dict[str, Any]:
+        """
+        Builds Nominatim-like location from the found names.
+
+        :param point: longitude & latitude
+        :param names: state's, county's, locality's, neighbourhood's and
+        road's names (or Nones)
+        :return: GIS API's location or an empty dict if the point's
+        outside the extract
+        """
+        if names['state'] is None:
+            return {}
+        names = {
+            k: v if v is None else v[:self._name_lengths[k]]
+            for k, v in names.items()
+        }
+        address = {
+            'road': names['road'],
+            'neighbourhood': names['neighbourhood'],
+            'city': names['locality'],
+            'county': names['county'],
+            'state': names['state'],
+            'country': self._country
+        }
+        address = {k: v for k, v in address.items() if v is not None}
+        return {
+            'lon': str(point[0]),
+            'lat': str(point[1]),
+            'display_name': ', '.join(address.values()),
+            'address': address
+        }
+
+    async def spare(self):
+        await super().spare()
+        await self._pool.close()
@@ -0,0 +1,89 @@
+"""
+This module describes maintenance workers - keepers
+
+Keepers don't collect any data; they keep the DB's structure in a good
+shape. E.g., flats are partitioned by the publication month, so the
+partitions of the next months must exist before the reapers insert new
+offers, and the oldest ones are moved out of the hot table.
+"""
+from datetime import date
+from core import DEFAULT_DSN
+from core.decorators import measurable
+from core.repositories import FlatPartitionRepository, OsmRepository
+from core.scribblers import KeeperScribbler
+from core.workers import Worker
+
+
+class Keeper(Worker):
+    """
+    DB maintenance worker, which needs neither a crawler nor a parser.
+    """
+    _scribbler_class = KeeperScribbler
+
+    async def _prepare(self):
+        self._repository = self._repository_class(self._scribbler)
+        await self._repository.prepare(DEFAULT_DSN)
+
+    async def _spare(self):
+        await self._repository.spare()
+
+
+class FlatPartitionKeeper(Keeper):
+    """
+    Keeper of the flats' monthly partitions. Failed creation of the next
+    months' partitions fails the whole run instead of being scribbled as
+    zero created partitions.
+
+    Class properties:
+        _ahead: number of the next months whose partitions are created
+        _retention: number of the past months whose partitions stay in
+        the flats' table
+    """
+    _repository_class = FlatPartitionRepository
+    _ahead = 2
+    _retention = 24
+
+    @measurable('keep')
+    async def _work(self):
+        created = await self._repository.create_partitions(self._ahead)
+        if created is None:
+            raise RuntimeError('flats\' partitions weren\'t created')
+        await self._scribbler.add('created', len(created))
+        archived = await self._repository.archive_partitions(
+            self._shift(date.today(), -self._retention)
+        )
+        await self._scribbler.add('archived', len(archived or ()))
+
+    @staticmethod
+    def _shift(day: date, months: int) -> date:
+        """
+        Finds the first day of the shifted month.
+
+        :param day: any day of the initial month
+        :param months: number of months to be added (or subtracted)
+        :return: shifted month's first day
+        """
+        month = day.year * 12 + day.month - 1 + months
+        return date(month // 12, month % 12 + 1, 1)
+
+
+class OsmKeeper(Keeper):
+    """
+    Keeper of the offline geolocator's OSM tables. It isn't scheduled;
+    it's launched by hand after the Ukrainian extract's import (the
+    imported tables may be dropped afterwards, as well as the offline
+    geolocator's stale locations' cache):
+    ```
+    $ osm2pgsql --latlong --database <db> ukraine-latest.osm.pbf
+    $ python manage.py OsmKeeper
+    $ rm resources/osm.sqlite3
+    ```
+    """
+    _repository_class = OsmRepository
+
+    @measurable('keep')
+    async def _work(self):
+        loaded = await self._repository.load()
+        if loaded is None:
+            raise RuntimeError('OSM extract wasn\'t loaded')
+        await self._scribbler.add('created', loaded)
@@ -0,0 +1,213 @@
+"""
+This module describes limiters - HTTP concurrency regulators
+
+Target sites' capacity changes during the day, so a hand-picked number
+of concurrent requests is either too small (the reaping is slow) or too
+big (requests time out and offers are lost). A limiter adjusts the number
+of in-flight requests from the observed latency and failures. External
+APIs, on the contrary, have fixed rate limits, which are shared by all
+workers' processes on the host; a token bucket enforces such a limit.
+"""
+from asyncio import Condition, sleep
+from fcntl import LOCK_EX, flock
+from os.path import join
+from time import monotonic, time
+from typing import Any, Dict
+from core import BASE_DIR
+
+
+def overloaded(status: int) -> bool:
+    """
+    Checks whether the response's status means the site's congestion.
+
+    :param status: HTTP response's status
+    :return: is the site overloaded (429 or 5xx)
+    """
+    return status == 429 or status >= 500
+
+
+class AdaptiveLimiter:
+    """
+    Semaphore with the AIMD (additive increase, multiplicative decrease)
+    adjustable capacity. Each fast successful request increases the limit
+    by 1 / limit (i.e. by 1 per the whole limit's worth of requests); a
+    slow request, a timeout or an overload response (429/5xx) cuts the
+    limit down. All requests which were in-flight at the moment of the
+    decrease suffer from the same congestion, so the limit is cut at most
+    once per cooldown period.
+
+    Class properties:
+        _increase: additive increase per the limit's worth of requests
+        _decrease: multiplicative decrease factor
+        _smoothing: weight of the latest latency in its moving average
+
+    Instance properties:
+        _limit: current (fractional) limit
+        _floor: minimal limit
+        _ceiling: maximal limit
+        _threshold: latency (in seconds) which is treated as a congestion
+        _in_flight: number of acquired slots
+        _condition: slots' waiting primitive (it's created by the first
+        request, so the limiter is bound to the loop which runs requests)
+        _latency: exponential moving average of the latency
+        _successes: number of successful requests
+        _failures: number of congested requests
+        _decreased: time of the last decrease
+    """
+    _increase = 1
+    _decrease = 0.5
+    _smoothing = 0.1
+
+    def __init__(
+        self, limit: int, ceiling: int, threshold: float, floor: int = 1
+    ):
+        self._limit = float(limit)
+        self._floor = floor
+        self._ceiling = ceiling
+        self._threshold = threshold
+        self._in_flight = 0
+        self._condition = None
+        self._latency = None
+        self._successes = 0
+        self._failures = 0
+        self._decreased = 0.0
+
+    @property
+    def limit(self) -> int:
+        """
+        Current number of allowed in-flight requests.
+        """
+        return max(self._floor, int(self._limit))
+
+    @property
+    def stats(self) -> Dict[str, Any]:
+        """
+        Current limit, in-flight requests and latency statistics.
+        """
+        return {
+            'limit': self.limit,
+            'in_flight': self._in_flight,
+            'latency': self._latency,
+            'successes': self._successes,
+            'failures': self._failures
+        }
+
+    async def acquire(self):
+        """
+        Waits for a free slot and takes it.
+        """
+        condition = self.__get_condition()
+        async with condition:
+            await condition.wait_for(lambda: self._in_flight < self.limit)
+            self._in_flight += 1
+
+    async def release(self):
+        """
+        Frees the slot and wakes up as many waiters as the limit allows.
+        """
+        condition = self.__get_condition()
+        async with condition:
+            self._in_flight -= 1
+            condition.notify(max(self.limit - self._in_flight, 0))
+
+    def __get_condition(self) -> Condition:
+        """
+        Creates the slots' waiting primitive inside the running loop.
+
+        :return: slots' waiting primitive
+        """
+        if self._condition is None:
+            self._condition = Condition()
+        return self._condition
+
+    async def __aenter__(self) -> 'AdaptiveLimiter':
+        await self.acquire()
+        return self
+
+    async def __aexit__(self, *args: Any):
+        await self.release()
+
+    def succeed(self, latency: float):
+        """
+        Registers the completed request: increases the limit if the
+        request was fast and decreases it otherwise.
+
+        :param latency: request's duration in seconds
+        """
+        self._latency = (
+            latency if self._latency is None
+            else self._smoothing * latency +
+            (1 - self._smoothing) * self._latency
+        )
+        if latency > self._threshold:
+            self.fail()
+            return
+        self._successes += 1
+        self._limit = min(
+            self._ceiling, self._limit + self._increase / self._limit
+        )
+
+    def fail(self):
+        """
+        Registers the congested request (timed out, overloaded or too
+        slow) and decreases the limit unless it's been done recently.
+        """
+        self._failures += 1
+        now = monotonic()
+        if now - self._decreased > self._threshold:
+            self._decreased = now
+            self._limit = max(self._floor, self._limit * self._decrease)
+
+
+class TokenBucket:
+    """
+    Token bucket whose state (tokens & the last refill's time) lives in
+    a local file, so all the host's processes share the same rate. The
+    state is read & updated under the exclusive file lock, which is held
+    only for the bookkeeping, so waiting for tokens doesn't block anyone.
+
+    Instance properties:
+        _path: absolute state file's path
+        _rate: number of tokens added per second
+        _capacity: max number of tokens (burst size)
+    """
+    def __init__(self, path: str, rate: float, capacity: int = 1):
+        self._path = join(BASE_DIR, path)
+        self._rate = rate
+        self._capacity = capacity
+
+    async def acquire(self):
+        """
+        Waits until the token's available and takes it.
+        """
+        delay = self._take()
+        while delay > 0:
+            await sleep(delay)
+            delay = self._take()
+
+    def _take(self) -> float:
+        """
+        Refills the bucket and takes a token if there's one.
+
+        :return: 0 if the token's taken or a delay (in seconds) until the
+        next token
+        """
+        with open(self._path, 'a+') as stream:
+            flock(stream, LOCK_EX)
+            stream.seek(0)
+            state = stream.read().split()
+            now = time()
+            if len(state) == 2:
+                tokens = min(
+                    self._capacity,
+                    float(state[0]) +
+                    max(now - float(state[1]), 0) * self._rate
+                )
+            else:
+                tokens = self._capacity
+            delay = 0 if tokens >= 1 else (1 - tokens) / self._rate
+            if delay == 0:
+                tokens -= 1
+            stream.truncate(0)
+            stream.write(f'{tokens} {now}')
+        return delay
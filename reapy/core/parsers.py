@@ -2,7 +2,8 @@
 This module describes the most essential part
 of the whole data flow - HTML parsing
 
-Parsers use BeautifulSoup4 in order to extract the target values and
+Parsers use BeautifulSoup4 (or its lxml-native counterpart, see
+:mod:`core.backends`) in order to extract the target values and
 build sophisticated data structures. They encapsulate the logic of
 HTML processing in the current class hierarchy, that's why all parsers
 are very portable and reusable.
@@ -16,6 +17,8 @@ from typing import Optional, List, Dict, Any, Tuple, Union
 from bs4 import BeautifulSoup
 from bs4.element import SoupStrainer, Tag
 from json import loads
+from core.arenas import unwrap
+from core.backends import Backend, SoupBackend, LxmlBackend
 from core.decorators import nullable
 from core.structs import Flat
 from core.utils import decimalize, json
@@ -33,11 +36,20 @@ class Parser:
 
     Class properties:
         _builder: default DOM nodes' processor
-        _offer_strainer: if provided, restricts tags' amount
+        _backend: default DOM tree's builder
+        _page_strainer: if provided, restricts tags' amount
         during the page parsing
+
+    Instance properties:
+        _backend: DOM tree's builder
     """
     _builder = 'lxml'
-    _offer_strainer = None
+    _backend = SoupBackend()
+    _page_strainer = None
+
+    def __init__(self, backend: Optional[Backend] = None):
+        if backend is not None:
+            self._backend = backend
 
     def parse_stop(self, markup: str) -> Optional[int]:
         """
@@ -47,7 +59,7 @@ class Parser:
         :return: last paging index or None
         """
         try:
-            return self._parse_stop(BeautifulSoup(markup, self._builder))
+            return self._parse_stop(self._backend.build(markup, self._builder))
         except (LookupError, AttributeError, ValueError, TypeError):
             logger.exception('stop parsing failed')
 
@@ -70,8 +82,8 @@ class Parser:
         :return: list of "raw offers"
         """
         try:
-            return self._parse_page(BeautifulSoup(
-                markup, self._builder, parse_only=self._offer_strainer
+            return self._parse_page(self._backend.build(
+                markup, self._builder, self._page_strainer
             ))
         except (AttributeError, TypeError, LookupError):
             logger.exception('page parsing failed')
@@ -94,18 +106,55 @@ class Parser:
         digital description. Mainly, the result includes such values
         as price, rate, location, etc.
 
-        :param offer: target dict with 'markup', 'url' and some other fields
+        :param offer: target dict with 'markup' (string or arena's slice),
+        'url', optional 'observed' (fetch's moment) and some other fields
         :return: special data structure or None if the check failed
         """
         url = ''
         try:
+            markup = unwrap(offer.pop('markup'))
             url = offer.pop('url')
-            soup = BeautifulSoup(offer.pop('markup'), self._builder)
-            if self._check_offer(soup):
-                return self._parse_offer(url, soup, **offer)
+            observed = offer.pop('observed', None)
+            struct = self.__parse_offer(url, markup, offer)
+            if struct is not None:
+                struct.observed = observed
+            return struct
         except (LookupError, AttributeError, ValueError, TypeError):
             logger.exception(f'{url} parsing failed')
 
+    def __parse_offer(
+        self, url: str, markup: str, fields: Dict[str, Any]
+    ) -> Optional[Any]:
+        """
+        Tries the DOM-free fast path and falls back to the DOM processing.
+
+        :param url: offer's URL
+        :param markup: offer page's markup
+        :param fields: offer's other fields
+        :return: special data structure or None if the check failed
+        """
+        try:
+            return self._extract_offer(url, markup, **fields)
+        except (LookupError, AttributeError, ValueError, TypeError):
+            pass
+        soup = self._backend.build(markup, self._builder)
+        if self._check_offer(soup):
+            return self._parse_offer(url, soup, **fields)
+
+    def _extract_offer(self, url: str, markup: str, **kwargs: Any) -> Any:
+        """
+        DOM-free fast path: checks and processes the offer without building
+        the tags' tree (e.g. using the data embedded into the page). Any
+        lookup, attribute, value or type error means that the page lacks
+        some value and falls the parsing back to the DOM processing.
+
+        :param url: offer page's url
+        :param markup: HTML markup
+        :param kwargs: additional offer's parameters
+        :return: short offer's view or None if the check failed
+        """
+        raise LookupError('DOM-free extraction isn\'t supported')
+
     def _check_offer(self, soup: BeautifulSoup) -> bool:
         """
         Validates the target page if it deserves to be parsed.
@@ -134,13 +183,15 @@ class Parser:
         Processes the target offer and decides whether it's obsolete or not.
 
         :param offer: target page's view
-        :return: offer's url if the page isn't obsolete and None otherwise
+        :return: offer's url if the page is junk (the offer's obsolete or gone)
+        and None otherwise
         """
         url = ''
         try:
+            markup = unwrap(offer['markup'])
             url = offer['url']
             return self._parse_junk(
-                url, BeautifulSoup(offer['markup'], self._builder)
+                url, self._backend.build(markup, self._builder)
             )
         except (TypeError, LookupError, AttributeError):
             logger.exception(f'{url} parsing failed')
@@ -151,7 +202,8 @@ class Parser:
 
         :param url: offer's url
         :param soup: DOM tags' tree
-        :return: offer's url if the page isn't obsolete and None otherwise
+        :return: offer's url if the page is junk (the offer's obsolete or gone)
+        and None otherwise
         """
         pass
 
@@ -220,7 +272,8 @@ class OlxEstateParser(EstateParser):
         _months: matches between literal and numeric months
         _shapes_pattern: regex pattern with offer's price and currency
     """
-    _offer_strainer = SoupStrainer('a')
+    _backend = LxmlBackend()
+    _page_strainer = SoupStrainer('a')
     _url_pattern = compile(r'^(\S+\.html)')
     _published_pattern = compile(r'(\d{1,2}) (\w+) (\d{4})')
     _months = {
@@ -422,7 +475,9 @@ class DomRiaEstateParser(EstateParser):
         _months: matches between literal and numeric months
         _json_pattern: regex pattern with offer's API data
         _impurities: extra words to be replaced in an offer's address
+        _dash_suffix: ending of the offer's type label
     """
+    _backend = LxmlBackend()
     _published_pattern = compile(r'(\d{2}) (\w{3})( \d{4})?')
     _months = {
         'січ': 1, 'янв': 1, 'лют': 2, 'фев': 2, 'бер': 3, 'мар': 3,
@@ -432,6 +487,7 @@ class DomRiaEstateParser(EstateParser):
     }
     _json_pattern = compile(r'STATE__=(.+);\(function')
     _impurities = (' ул.', ' просп.', ' пер.', ' буд.', ' бул.', ' вул.')
+    _dash_suffix = ' житло'
 
     def _parse_stop(self, soup: BeautifulSoup) -> int:
         return int(
@@ -512,10 +568,31 @@ class DomRiaEstateParser(EstateParser):
         :param soup: DOM tags' tree
         :return: offer's positional data (either point or geodict)
         """
-        data = loads(self._json_pattern.search(next(filter(
+        return self._extract_geolocation(self._extract_realty(next(filter(
             lambda t: t.text.startswith('window'),
             soup.find_all('script')
-        )).text).groups()[0])['dataForFinalPage']['realty']
+        )).text))
+
+    def _extract_realty(self, text: str) -> Dict[str, Any]:
+        """
+        Finds the page's state JSON and fetches offer's API data.
+
+        :param text: HTML markup or its script
+        :return: offer's API data
+        """
+        return loads(
+            self._json_pattern.search(text).groups()[0]
+        )['dataForFinalPage']['realty']
+
+    def _extract_geolocation(
+        self, data: Dict[str, Any]
+    ) -> Dict[str, Union[str, Tuple[float, float]]]:
+        """
+        Transforms offer's API data into geodict.
+
+        :param data: offer's API data
+        :return: offer's positional data (either point or geodict)
+        """
         try:
             return {
                 'point': (
@@ -541,6 +618,63 @@ class DomRiaEstateParser(EstateParser):
             )
         ))
 
+    @staticmethod
+    def _check_realty(data: Dict[str, Any]) -> bool:
+        """
+        Validates offer's API data if it deserves to be parsed (the offer
+        isn't sold and has a fixed price).
+
+        :param data: offer's API data
+        :return: is target offer valid or not
+        """
+        return not data['isSold'] and len(data['priceArr']) > 0
+
+    @staticmethod
+    def _extract_published(data: Dict[str, Any]) -> date:
+        """
+        Fetches offer's publication date from its API data.
+
+        :param data: offer's API data
+        :return: offer's publication date
+        """
+        return datetime.strptime(
+            data['publishing_date'], '%Y-%m-%d %H:%M:%S'
+        ).date()
+
+    @staticmethod
+    def _extract_price(data: Dict[str, Any]) -> Decimal:
+        """
+        Extracts offer's price (in USD) from its API data.
+
+        :param data: offer's API data
+        :return: offer's price
+        """
+        return decimalize(data['priceArr']['1'].replace(' ', ''))
+
+    def _extract_pairs(self, data: Dict[str, Any]) -> Dict[str, str]:
+        """
+        Builds the same tabular data as the page's description and
+        additional info do, but from offer's API data.
+
+        :param data: offer's API data
+        :return: offer's numeric values and details
+        """
+        pairs = {
+            c['name']: str(c['value'])
+            for c in data['mainCharacteristics']['chars']
+        }
+        pairs.update(
+            p.split(': ')[:2]
+            for g in data['secondaryParams']
+            for p in g['items']
+            if ': ' in p
+        )
+        pairs['Тип'] = next(filter(
+            lambda d: d.endswith(self._dash_suffix),
+            data['mainCharacteristics']['dashes']
+        ), None)
+        return pairs
+
     def _parse_price(self, soup: BeautifulSoup) -> Decimal:
         """
         Extracts offer's price (in USD).
@@ -604,7 +738,7 @@ class DomRiaFlatParser(DomRiaEstateParser):
         __area_pattern: regex to extract flat's area shapes
         during the page processing
     """
-    _offer_strainer = SoupStrainer('section')
+    _page_strainer = SoupStrainer('section')
     _details = json('resources/dom_ria_flat_reaper/details.json')
     __area_pattern = compile(r'Площа (\S+)/(\S+)/(\S+)')
 
@@ -638,6 +772,28 @@ class DomRiaFlatParser(DomRiaEstateParser):
                 'kitchen_area': self._float(areas[2])
             }
 
+    def _extract_offer(self, url: str, markup: str, **kwargs: Any) -> Flat:
+        data = self._extract_realty(markup)
+        if not self._check_realty(data):
+            return None
+        pairs = self._extract_pairs(data)
+        params = self.__parse_parameters(pairs)
+        return Flat(
+            url=url,
+            avatar=kwargs['avatar'],
+            published=self._extract_published(data),
+            geolocation=self._extract_geolocation(data),
+            price=self._extract_price(data),
+            area=kwargs['area'],
+            living_area=kwargs['living_area'],
+            kitchen_area=kwargs['kitchen_area'],
+            rooms=params['rooms'],
+            floor=params['floor'],
+            total_floor=params['total_floor'],
+            ceiling_height=params['ceiling_height'],
+            details=self._parse_details(pairs)
+        )
+
     def _parse_offer(
         self, url: str, soup: BeautifulSoup, **kwargs: Any
     ) -> Flat:
@@ -662,7 +818,7 @@ class DomRiaFlatParser(DomRiaEstateParser):
     def _parse_pairs(self, soup: BeautifulSoup) -> Dict[str, str]:
         pairs = super()._parse_pairs(soup)
         pairs['Тип'] = next(filter(
-            lambda t: t.endswith(' житло'),
+            lambda t: t.endswith(self._dash_suffix),
             map(
                 lambda t: t.text.strip(),
                 soup.find_all('li', 'labelHot')
@@ -3,16 +3,19 @@ This module describes main *reapy*'s workers - reapers
 
 Reapers are in charge of data mining in general - they orchestrate all
 low-level operations like scraping, DB connectivity, HTML parsing, etc.
-Reapers leverage Clix API to imitate RX programming techniques.
+Reapers leverage Clix API to imitate RX programming techniques; their
+pipelines are streamed, so offers reach the DB while the rest of them
+are still being crawled.
 """
 from abc import ABC
-from typing import Dict, Any
-from core.clixes import Clix
+from typing import Dict, Any, List
+from core import DEFAULT_DSN
+from core.clixes import StreamingClix
 from core.decorators import measurable
 from core.geomappers import NominatimGeomapper
 from core.scribblers import ReaperScribbler
 from core.repositories import FlatRepository
-from core.workers import Worker
+from core.workers import Worker, parse_page, parse_offer
 from core.converters import NBUConverter
 from core.crawlers import OlxFlatCrawler, DomRiaFlatCrawler, EstateCrawler
 from core.geolocators import NominatimGeolocator
@@ -33,16 +36,19 @@ class Reaper(Worker, ABC):
      - Offer parsing: offer pages' HTML processing;
      - (Optional) Currency conversion: prices' conversion (into USD);
      - Validation: structs' numeric inspections;
-     - Geocoding & reversing: objects' positioning;
-     - Geomapping: GIS responses' processing;
+     - Geolocation: known geolocations' reuse or objects' positioning
+       (geocoding & reversing) and GIS responses' processing;
      - Distinction: duplicates' deletion or updating;
      - Storing: resulting object's insertion to the DB;
+     - Confirmation: stored offers' pages' caching;
     Reapers' data flow may change from instance to instance but generally
     stages' positions are stable and ordered.
 
     Class properties:
         _ranger_class: index segment generator's class
         _validator_class: numeric range checker's class
+        _chunk_size: number of structs distinct & stored via a few DB
+        queries
 
     Instance properties:
         _ranger: index segment generator
@@ -51,6 +57,7 @@ class Reaper(Worker, ABC):
     _scribbler_class = ReaperScribbler
     _ranger_class = Ranger
     _validator_class = Validator
+    _chunk_size = 50
 
     async def _prepare(self):
         await super()._prepare()
@@ -80,8 +87,40 @@ class EstateReaper(Reaper, ABC):
         self._geolocator = self._geolocator_class(
             self._scribbler, self._crawler
         )
+        await self._geolocator.prepare(DEFAULT_DSN)
         self._geomapper = self._geomapper_class()
 
+    async def _spare(self):
+        await self._geolocator.spare()
+        await super()._spare()
+
+    @measurable('reap')
+    async def _work(self):
+        await self._reap(self._crawl())
+
+    def _crawl(self) -> StreamingClix:
+        """
+        Builds the stream of the site's offers.
+
+        :return: "raw offers" with non-empty 'markup' fields
+        """
+        return (
+            StreamingClix(self._ranger.range, self._executor)
+            .reform(self._crawler.get_page)
+            .map(parse_page)
+            .flatten()
+            .distinct(self._get_url)
+            .reform(self._crawler.get_offer, self._filter_offer)
+        )
+
+    async def _reap(self, offers: StreamingClix):
+        """
+        Parses, validates, locates and stores the offers.
+
+        :param offers: stream of "raw offers" with markups
+        """
+        raise NotImplementedError()
+
     @staticmethod
     def _get_url(offer: Dict[str, Any]) -> str:
         """
@@ -115,14 +154,35 @@ class EstateReaper(Reaper, ABC):
 
     async def _set_geolocation(self, estate: Any) -> Any:
         """
-        Configures estate's location dict.
+        Configures estate's location dict. The nearest known geolocation's
+        address is reused if it's close enough; otherwise, the estate is
+        located via GIS API and its location is processed.
 
         :param estate: target entity to be configured
-        :return: modified estate
+        :return: modified estate with fully set location (or None)
         """
-        estate.geolocation = await self._geolocator.locate(estate.geolocation)
+        point = estate.geolocation.get('point')
+        geolocation = (
+            None if point is None
+            else await self._repository.find_geolocation(point)
+        )
+        if geolocation is None:
+            location = await self._geolocator.locate(estate.geolocation)
+            geolocation = (
+                None if location is None else self._geomapper.map(location)
+            )
+        estate.geolocation = geolocation
         return estate
 
+    async def _confirm(self, estates: List[Any]):
+        """
+        Confirms the stored estates' cached pages, so they're skipped
+        as unchanged during the next runs.
+
+        :param estates: stored entities
+        """
+        await self._crawler.confirm(e.url for e in estates)
+
     @staticmethod
     def _filter_geolocation(estate: Any) -> bool:
         """
@@ -133,16 +193,6 @@ class EstateReaper(Reaper, ABC):
         """
         return notnull(estate.geolocation)
 
-    async def _map_geolocation(self, estate: Any) -> Any:
-        """
-        Processes estate's location dict.
-
-        :param estate: target entity to be configured
-        :return: modified estate with fully set location
-        """
-        estate.geolocation = self._geomapper.map(estate.geolocation)
-        return estate
-
 
 class OlxEstateReaper(EstateReaper):
     """
@@ -198,22 +248,19 @@ class OlxEstateReaper(EstateReaper):
         """
         return notnull(estate.price)
 
-    @measurable('reap')
-    async def _work(self):
+    async def _reap(self, offers: StreamingClix):
         await (
-            Clix(self._ranger.range)
-            .reform(self._crawler.get_page)
-            .map(self._parser.parse_page)
-            .flatten()
-            .distinct(self._get_url)
-            .reform(self._crawler.get_offer, self._filter_offer)
-            .sieve(self._parser.parse_offer, self._filter_estate)
+            offers
+            .sieve(parse_offer, self._filter_estate)
             .reform(self._set_price, self._filter_price)
             .sieve(self._set_rate, self._validator.validate)
-            .reform(self._repository.distinct)
+            .chunk(self._chunk_size)
+            .reform(self._repository.distinct_many)
+            .flatten()
             .reform(self._set_geolocation, self._filter_geolocation)
-            .reform(self._map_geolocation, self._filter_geolocation)
-            .apply(self._repository.create)
+            .chunk(self._chunk_size)
+            .reform(self._repository.create_many)
+            .apply(self._confirm)
         )
 
 
@@ -233,21 +280,18 @@ class DomRiaEstateReaper(EstateReaper):
     """
     Estate's data miner which is specialized on dom.ria.com estate.
     """
-    @measurable('reap')
-    async def _work(self):
+    async def _reap(self, offers: StreamingClix):
         await (
-            Clix(self._ranger.range)
-            .reform(self._crawler.get_page)
-            .map(self._parser.parse_page)
-            .flatten()
-            .distinct(self._get_url)
-            .reform(self._crawler.get_offer, self._filter_offer)
-            .sieve(self._parser.parse_offer)
+            offers
+            .sieve(parse_offer)
             .sieve(self._set_rate, self._validator.validate)
             .reform(self._set_geolocation, self._filter_geolocation)
-            .reform(self._map_geolocation, self._filter_geolocation)
-            .reform(self._repository.distinct)
-            .apply(self._repository.create)
+            .chunk(self._chunk_size)
+            .reform(self._repository.distinct_many)
+            .flatten()
+            .chunk(self._chunk_size)
+            .reform(self._repository.create_many)
+            .apply(self._confirm)
         )
 
 
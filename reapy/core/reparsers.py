@@ -0,0 +1,56 @@
+"""
+This module describes offline reapers - reparsers
+
+Reparsers don't crawl the sites: they replay the offer pages kept in the
+crawlers' markup archives through the same stages the reapers use (parsing,
+validation, geolocation, distinction & storing). The parsing is spread over
+the whole process pool, so it's bound only by the host's cores. Reparsers
+aren't scheduled; they're launched by hand when the parser's fixed after
+the site's markup change:
+```
+$ python manage.py OlxFlatReparser
+```
+"""
+from abc import ABC
+from time import time
+from typing import Any, AsyncIterator, Dict
+from core.clixes import StreamingClix
+from core.geolocators import OsmGeolocator
+from core.reapers import DomRiaFlatReaper, EstateReaper, OlxFlatReaper
+
+
+class Reparser(EstateReaper, ABC):
+    """
+    Reaper whose offers come from the markup archive instead of the site.
+    A replay may bring lots of unknown points at once, so they're reversed
+    offline (see :class:`core.keepers.OsmKeeper`) rather than throttled by
+    Nominatim's rate limit.
+
+    Class properties:
+        _period: age (in seconds) of the oldest fetches to be reparsed
+    """
+    _geolocator_class = OsmGeolocator
+    _period = 7 * 24 * 60 * 60
+
+    def _crawl(self) -> StreamingClix:
+        return StreamingClix(self._get_offers, self._executor)
+
+    async def _get_offers(self) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Reads the archived offers lazily.
+
+        :return: "raw offers" with 'markup' fields
+        """
+        return self._crawler.get_archived_offers(time() - self._period)
+
+
+class OlxFlatReparser(Reparser, OlxFlatReaper):
+    """
+    Offline www.olx.ua flats' reaper.
+    """
+
+
+class DomRiaFlatReparser(Reparser, DomRiaFlatReaper):
+    """
+    Offline dom.ria.com flats' reaper.
+    """
@@ -5,9 +5,13 @@ Hierarchy presented here supplies succinct and reusable interface for
 the DB interaction. Repositories perform CRUD queries, encapsulating
 all manipulations with the data source.
 """
+from datetime import date, datetime, timezone
 from logging import getLogger
-from typing import Any, Optional, List, Dict
+from re import compile
+from typing import Any, AsyncIterator, Optional, List, Dict, Tuple
+from time import monotonic
 from asyncpg import UniqueViolationError, create_pool, Connection, Record
+from asyncpg.prepared_stmt import PreparedStatement
 from core.decorators import transactional
 from core.scribblers import Scribbler
 from core.structs import Flat
@@ -24,17 +28,25 @@ class Repository:
 
     Class properties:
         _max_pool_size: maximal number of concurrent DB connections
+        _statements: hot queries by their names, which are prepared once
+        per connection (when it's opened by the pool)
 
     Instance properties:
         _scribbler: statistician, which counts all logical actions
         (insertions, duplicates, etc)
         _pool: low-level collection of DB connections
+        _prepared: prepared statements by their connections' server PIDs
+        and their names
+        _timings: statements' numbers of calls and total durations
     """
     _max_pool_size = 45
+    _statements: Dict[str, str] = {}
 
     def __init__(self, scribbler: Scribbler):
         self._scribbler = scribbler
         self._pool = None
+        self._prepared: Dict[int, Dict[str, PreparedStatement]] = {}
+        self._timings: Dict[str, List[float]] = {}
 
     async def prepare(self, dsn: str):
         """
@@ -42,7 +54,41 @@ class Repository:
 
         :param dsn: DB server's url
         """
-        self._pool = await create_pool(dsn, max_size=self._max_pool_size)
+        self._pool = await create_pool(
+            dsn, max_size=self._max_pool_size, init=self.__init_connection
+        )
+
+    async def __init_connection(self, connection: Connection):
+        """
+        Prepares all registered statements on the new connection.
+
+        :param connection: DB connection
+        """
+        self._prepared[connection.get_server_pid()] = {
+            n: await connection.prepare(q) for n, q in self._statements.items()
+        }
+
+    async def _query(
+        self, connection: Connection, name: str, method: str, *args: Any
+    ) -> Any:
+        """
+        Runs the registered statement, which is prepared on the connection,
+        and measures its duration.
+
+        :param connection: DB connection
+        :param name: statement's name
+        :param method: statement's method (fetch, fetchrow or fetchval)
+        :param args: statement's arguments
+        :return: statement's result
+        """
+        statement = self._prepared[connection.get_server_pid()][name]
+        start = monotonic()
+        try:
+            return await getattr(statement, method)(*args)
+        finally:
+            timing = self._timings.setdefault(name, [0, 0.0])
+            timing[0] += 1
+            timing[1] += monotonic() - start
 
     @transactional('couldn\'t distinct struct')
     async def distinct(
@@ -60,7 +106,29 @@ class Repository:
         record = await self._find_record(connection, struct)
         if record is None:
             return struct
-        await self._update_record(connection, record, struct)
+        await self._update_records(connection, [(record, struct)])
+
+    @transactional('couldn\'t distinct structs')
+    async def distinct_many(
+        self, connection: Connection, structs: List[Any]
+    ) -> List[Any]:
+        """
+        Batched `distinct`: recognizes all structs' duplicates at once
+        and tries to update the existing rows.
+
+        :param connection: DB connection
+        :param structs: target entities to be checked
+        :return: structs whose records don't exist
+        """
+        records = await self._find_records(connection, structs)
+        fresh, duplicates = [], []
+        for struct, record in zip(structs, records):
+            if record is None:
+                fresh.append(struct)
+            else:
+                duplicates.append((record, struct))
+        await self._update_records(connection, duplicates)
+        return fresh
 
     async def _find_record(
         self, connection: Connection, struct: Any
@@ -74,6 +142,19 @@ class Repository:
         """
         pass
 
+    async def _find_records(
+        self, connection: Connection, structs: List[Any]
+    ) -> List[Optional[Record]]:
+        """
+        Tries to find duplicates of the provided structs. By default, the
+        structs are checked one by one.
+
+        :param connection: DB connection
+        :param structs: target entities to be checked
+        :return: duplicated records (or Nones) in the structs' order
+        """
+        return [await self._find_record(connection, s) for s in structs]
+
     async def _update_record(
         self, connection: Connection, record: Record, struct: Any
     ):
@@ -87,6 +168,19 @@ class Repository:
         """
         pass
 
+    async def _update_records(
+        self, connection: Connection, duplicates: List[Tuple[Record, Any]]
+    ):
+        """
+        Tries to update the existing rows. By default, the rows are
+        updated one by one.
+
+        :param connection: DB connection
+        :param duplicates: target DB rows and their possible data replacers
+        """
+        for record, struct in duplicates:
+            await self._update_record(connection, record, struct)
+
     @transactional('creation failed')
     async def create(self, connection: Connection, struct: Any):
         """
@@ -108,10 +202,53 @@ class Repository:
         """
         pass
 
+    @transactional('bulk creation failed')
+    async def create_many(
+        self, connection: Connection, structs: List[Any]
+    ) -> List[Any]:
+        """
+        Stores the validated data structures into the DB at once and
+        updates the progress. Structs which violate uniqueness are skipped.
+
+        :param connection: DB connection
+        :param structs: target entities to be saved
+        :return: the same structs (if the transaction's committed)
+        """
+        inserted = await self._create_records(connection, structs)
+        await self._scribbler.add('inserted', inserted)
+        await self._scribbler.add('duplicated', len(structs) - inserted)
+        return structs
+
+    async def _create_records(
+        self, connection: Connection, structs: List[Any]
+    ) -> int:
+        """
+        Inserts the target structs into the DB. By default, the structs
+        are inserted one by one.
+
+        :param connection: DB connection
+        :param structs: target entities to be saved
+        :return: number of inserted structs
+        """
+        inserted = 0
+        for struct in structs:
+            try:
+                async with connection.transaction():
+                    await self._create_record(connection, struct)
+                inserted += 1
+            except UniqueViolationError:
+                pass
+        return inserted
+
     async def spare(self):
         """
-        Releases DB connection pool.
+        Reports statements' timings and releases DB connection pool.
         """
+        for name, (calls, duration) in sorted(self._timings.items()):
+            logger.info(
+                f'{name} took {duration:.3f} s in {calls} calls '
+                f'({duration / calls * 1000:.2f} ms per call)'
+            )
         await self._pool.close()
 
 
@@ -119,72 +256,284 @@ class EstateRepository(Repository):
     """
     Upgraded repository, which supplies low-level methods for estate-based
     entities. Also it's aware of estates' geolocations and details.
+
+    Class properties:
+        _table: estates' table name
+        _geolocation_radius: max distance (in meters) to the known
+        geolocation whose address can be reused by the new estate
+        _prefetch: number of rows fetched by the server-side cursor at once
+        _address_lengths: geolocations' address columns' max lengths
+
+    Instance properties:
+        _details: details' ids by their values (the details' table is
+        a small static dictionary, so it's loaded once)
     """
+    _table = None
+    _geolocation_radius = 25
+    _prefetch = 1000
+    _address_lengths = {
+        'state': 30, 'locality': 40, 'county': 40,
+        'neighbourhood': 90, 'road': 80, 'house_number': 20
+    }
+    _statements = {
+        'find_geolocation': '''
+            SELECT state, locality, county, neighbourhood, road, 
+            house_number 
+            FROM geolocations 
+            WHERE st_dwithin(
+                point::geography, 
+                st_setsrid(st_point($1, $2), 4326)::geography, $3
+            ) 
+            ORDER BY point::geography <-> 
+            st_setsrid(st_point($1, $2), 4326)::geography 
+            LIMIT 1
+        ''',
+        'upsert_geolocation': '''
+            WITH inserted AS (
+                INSERT INTO geolocations (
+                    state, locality, county, neighbourhood, 
+                    road, house_number, point
+                ) VALUES (
+                    $1, $2, $3, $4, $5, $6, st_setsrid(st_point($7, $8), 4326)
+                ) 
+                ON CONFLICT (point) DO NOTHING 
+                RETURNING id
+            ) 
+            SELECT id FROM inserted 
+            UNION ALL 
+            SELECT id FROM geolocations 
+            WHERE point = st_setsrid(st_point($7, $8), 4326) 
+            LIMIT 1
+        ''',
+        'get_geolocation': '''
+            SELECT id FROM geolocations 
+            WHERE point = st_setsrid(st_point($1, $2), 4326)
+        '''
+    }
+
+    def __init__(self, scribbler: Scribbler):
+        super().__init__(scribbler)
+        self._details: Dict[str, int] = {}
+
+    async def prepare(self, dsn: str):
+        await super().prepare(dsn)
+        await self.refresh_details()
+
+    async def refresh_details(self):
+        """
+        Reloads details' ids (must be called if the details' table's
+        changed after the preparation).
+        """
+        async with self._pool.acquire() as connection:
+            self._details = {
+                r['value']: r['id'] for r in
+                await connection.fetch('SELECT id, value FROM details')
+            }
+
+    async def find_visible(self, pattern: str) -> AsyncIterator[Record]:
+        """
+        Streams visible estates through the server-side cursor, so the
+        whole table is never held in memory.
+
+        :param pattern: estates' URLs' regex
+        :return: estates' ids & URLs
+        """
+        async with self._pool.acquire() as connection:
+            async with connection.transaction(readonly=True):
+                async for record in connection.cursor(
+                    f'''
+                    SELECT id, url FROM {self._table} 
+                    WHERE is_visible AND url ~ $1
+                    ''',
+                    pattern,
+                    prefetch=self._prefetch
+                ):
+                    yield record
+
+    @transactional('couldn\'t hide estates')
+    async def hide_many(self, connection: Connection, ids: List[int]):
+        """
+        Hides the obsolete estates at once and updates the progress.
+
+        :param connection: DB connection
+        :param ids: estates' ids
+        """
+        status = await connection.execute(
+            f'UPDATE {self._table} SET is_visible = FALSE WHERE id = ANY($1)',
+            ids
+        )
+        await self._scribbler.add('discarded', int(status.split()[-1]))
+
+    @transactional('couldn\'t find nearby geolocation')
+    async def find_geolocation(
+        self, connection: Connection, point: Tuple[float, float]
+    ) -> Optional[Dict[str, Any]]:
+        """
+        Finds the nearest known geolocation within the radius (leveraging
+        KNN search over geography's GiST index) and reuses its address.
+        The estate keeps its own point, so the flats of the adjacent
+        buildings don't share the same geolocation (and aren't taken
+        for duplicates).
+
+        :param connection: DB connection
+        :param point: estate's longitude & latitude
+        :return: geolocation's dict (in the geomapper's format) or None
+        """
+        record = await self._query(
+            connection, 'find_geolocation', 'fetchrow',
+            point[0], point[1], self._geolocation_radius
+        )
+        if record is not None:
+            return dict(record, point=point)
+
     async def _create_record(self, connection: Connection, struct: Any):
         geolocation = await self.__get_geolocation(connection, struct.geolocation)
         estate = await self._create_estate(connection, struct, geolocation)
         await self._set_estate_details(connection, estate, struct.details)
 
-    async def __get_geolocation(
-        self, connection: Connection, geodict: Dict[str, Any]
-    ) -> Record:
+    async def _create_records(
+        self, connection: Connection, structs: List[Any]
+    ) -> int:
+        """
+        Copies the structs into the session's staging tables and merges
+        them into the main ones with a few set-based statements.
+
+        :param connection: DB connection
+        :param structs: target entities to be saved
+        :return: number of inserted structs
         """
-        Inserts if not exists and then returns geolocation record.
-        Exception handling is needed for the race condition avoidance.
+        await self.__stage(connection, structs)
+        await self._stage_estates(connection, structs)
+        await self.__merge_geolocations(connection)
+        estates = await self._merge_estates(connection)
+        await self._merge_estate_details(connection, estates)
+        return len(estates)
+
+    async def __stage(self, connection: Connection, structs: List[Any]):
+        """
+        Copies structs' geolocations & details into the staging tables,
+        which live during the session and are emptied on commits.
 
         :param connection: DB connection
+        :param structs: target entities to be saved
+        """
+        await connection.execute(
+            '''
+            CREATE TEMPORARY TABLE IF NOT EXISTS staging_geolocations (
+                i integer, state varchar(30), locality varchar(40), 
+                county varchar(40), neighbourhood varchar(90), 
+                road varchar(80), house_number varchar(20), 
+                lon float8, lat float8
+            ) ON COMMIT DELETE ROWS;
+            CREATE TEMPORARY TABLE IF NOT EXISTS staging_details (
+                i integer, detail_id integer
+            ) ON COMMIT DELETE ROWS
+            '''
+        )
+        await connection.copy_records_to_table(
+            'staging_geolocations',
+            records=[
+                (i, *self.__clip_address(g), g['point'][0], g['point'][1])
+                for i, g in enumerate(s.geolocation for s in structs)
+            ]
+        )
+        await connection.copy_records_to_table(
+            'staging_details',
+            records=[
+                (i, d) for i, s in enumerate(structs)
+                for d in self._find_details(s.details)
+            ]
+        )
+
+    def __clip_address(self, geodict: Dict[str, Any]) -> Tuple[Optional[str], ...]:
+        """
+        Clips geolocation's address names to the columns' lengths: the
+        geocoders' names may be longer, and a single over-long name would
+        fail the whole batch's copying.
+
         :param geodict: dictionary with geolocation's attributes
-        :return:
+        :return: state, locality, county, neighbourhood, road & house number
         """
-        try:
-            async with connection.transaction():
-                return await self.__create_geolocation(connection, geodict)
-        except UniqueViolationError:
-            return await self.__find_geolocation(connection, geodict)
+        return tuple(
+            None if geodict[k] is None else geodict[k][:n]
+            for k, n in self._address_lengths.items()
+        )
 
     @staticmethod
-    async def __create_geolocation(
-        connection: Connection, geodict: Dict[str, Any]
-    ) -> Record:
+    async def __merge_geolocations(connection: Connection):
         """
-        Inserts new geolocation record and returns its id.
+        Batched geolocations' upsert: inserts all staged points which
+        aren't in the DB yet, so every staged estate can be joined with
+        its geolocation's id by the point.
 
         :param connection: DB connection
-        :param geodict: dictionary with geolocation's attributes
-        :return: geolocation's record with id
         """
-        return await connection.fetchrow(
+        await connection.execute(
             '''
             INSERT INTO geolocations (
                 state, locality, county, neighbourhood, 
                 road, house_number, point
-            ) VALUES (
-                $1, $2, $3, $4, $5, $6, st_setsrid(st_point($7, $8), 4326)
-            ) RETURNING id
-            ''',
-            geodict['state'], geodict['locality'], geodict['county'],
-            geodict['neighbourhood'], geodict['road'], geodict['house_number'],
-            geodict['point'][0], geodict['point'][1]
+            ) 
+            SELECT DISTINCT ON (lon, lat) state, locality, county, 
+            neighbourhood, road, house_number, 
+            st_setsrid(st_point(lon, lat), 4326) 
+            FROM staging_geolocations 
+            ON CONFLICT (point) DO NOTHING
+            '''
         )
 
-    @staticmethod
-    async def __find_geolocation(
-        connection: Connection, geodict: Dict[str, Any]
+    async def _stage_estates(self, connection: Connection, structs: List[Any]):
+        """
+        Copies estates' own fields into the staging table.
+
+        :param connection: DB connection
+        :param structs: target entities to be saved
+        """
+        pass
+
+    async def _merge_estates(self, connection: Connection) -> List[Record]:
+        """
+        Inserts staged estates which aren't duplicates.
+
+        :param connection: DB connection
+        :return: newly created estates' records (ids & urls)
+        """
+        pass
+
+    async def _merge_estate_details(
+        self, connection: Connection, estates: List[Record]
+    ):
+        """
+        Binds newly created estates to their staged details.
+
+        :param connection: DB connection
+        :param estates: newly created estates' records
+        """
+        pass
+
+    async def __get_geolocation(
+        self, connection: Connection, geodict: Dict[str, Any]
     ) -> Record:
         """
-        Finds geolocation with the provided location's position.
+        Inserts if not exists and then returns geolocation record via
+        a single upsert. Only if a concurrent transaction's inserted the
+        same point in the meantime, the record's looked up once more.
 
         :param connection: DB connection
         :param geodict: dictionary with geolocation's attributes
-        :return:
+        :return: geolocation's record with id
         """
-        return await connection.fetchrow(
-            '''
-            SELECT id FROM geolocations 
-            WHERE point = st_setsrid(st_point($1, $2), 4326)
-            ''',
+        geolocation = await self._query(
+            connection, 'upsert_geolocation', 'fetchrow',
+            *self.__clip_address(geodict),
             geodict['point'][0], geodict['point'][1]
         )
+        if geolocation is None:
+            geolocation = await self._query(
+                connection, 'get_geolocation', 'fetchrow',
+                geodict['point'][0], geodict['point'][1]
+            )
+        return geolocation
 
     async def _create_estate(
         self, connection: Connection, struct: Any, geolocation: Record
@@ -209,23 +558,19 @@ class EstateRepository(Repository):
         :param estate: newly created estate's record
         :param details_values: estate details' list
         """
-        details = await self.__find_details(connection, details_values)
+        details = self._find_details(details_values)
         await self._create_estate_details(connection, estate, details)
 
-    @staticmethod
-    async def __find_details(
-        connection: Connection, details_values: List[str]
-    ) -> List[Record]:
+    def _find_details(self, details_values: List[str]) -> List[int]:
         """
-        Finds all details' records whose values are in details' list.
+        Finds ids of all details whose values are in details' list.
 
-        :param connection: DB connection
         :param details_values: the set of string literals
-        :return: details' records
+        :return: details' ids
         """
-        details = await connection.fetch(
-            'SELECT id FROM details WHERE value = ANY ($1)', details_values
-        )
+        details = [
+            self._details[v] for v in details_values if v in self._details
+        ]
         if len(details) != len(details_values):
             logger.warning(
                 f'some of these details are absent in the DB:\n{details_values}'
@@ -233,14 +578,14 @@ class EstateRepository(Repository):
         return details
 
     async def _create_estate_details(
-        self, connection: Connection, estate: Record, details: List[Record]
+        self, connection: Connection, estate: Record, details: List[int]
     ):
         """
         Inserts connections between estates and existing details.
 
         :param connection: DB connection
         :param estate: newly created estate's record
-        :param details: all spotted details' records
+        :param details: all spotted details' ids
         """
         pass
 
@@ -256,55 +601,190 @@ class FlatRepository(EstateRepository):
         offer's position to distinct duplicates among flats' offers
         (mainly, connected with floating numbers' errors of www.olx.ua)
     """
+    _table = 'flats'
     __area_tolerance = 1.5
     __distance_tolerance = 4500
+    _statements = {
+        **EstateRepository._statements,
+        'find_flat': '''
+            (SELECT id, price, geolocation_id FROM flats WHERE url = $1) 
+            UNION ALL 
+            (
+                SELECT f.id, price, geolocation_id 
+                FROM flats f JOIN geolocations g ON geolocation_id = g.id 
+                WHERE rooms = $2 AND floor = $3 AND total_floor = $4 AND 
+                abs(area - $5) <= $6 AND st_dwithin(
+                    point::geography, 
+                    st_setsrid(st_point($7, $8), 4326)::geography, $9
+                )
+            ) 
+            LIMIT 1
+        ''',
+        'find_flats': '''
+            SELECT c.i, r.id, r.price, r.geolocation_id 
+            FROM unnest(
+                $1::varchar[], $2::smallint[], $3::smallint[], 
+                $4::smallint[], $5::float8[], $6::float8[], $7::float8[]
+            ) WITH ORDINALITY AS c(
+                url, rooms, floor, total_floor, area, lon, lat, i
+            ) 
+            JOIN LATERAL (
+                (SELECT id, price, geolocation_id FROM flats WHERE url = c.url) 
+                UNION ALL 
+                (
+                    SELECT f.id, price, geolocation_id 
+                    FROM flats f JOIN geolocations g ON geolocation_id = g.id 
+                    WHERE rooms = c.rooms AND floor = c.floor AND 
+                    total_floor = c.total_floor AND 
+                    abs(area - c.area) <= $8 AND st_dwithin(
+                        point::geography, 
+                        st_setsrid(st_point(c.lon, c.lat), 4326)::geography, 
+                        $9
+                    )
+                ) 
+                LIMIT 1
+            ) r ON TRUE
+        ''',
+        'update_flat': '''
+            UPDATE flats SET 
+            url = $1, avatar = $2, published = $3, price = $4, 
+            rate = $5, area = $6, living_area = $7, kitchen_area = $8, 
+            ceiling_height = $9 
+            WHERE id = $10
+        ''',
+        'lock_flat_url': '''
+            SELECT pg_advisory_xact_lock(hashtext('flats'), hashtext($1))
+        ''',
+        'lock_flat_place': '''
+            SELECT pg_advisory_xact_lock(
+                hashtext('flat_places'), hashtext(concat_ws(
+                    ',', $1::integer, $2::smallint, $3::smallint, $4::smallint
+                ))
+            )
+        ''',
+        'create_flat': '''
+            WITH inserted AS (
+                INSERT INTO flats (
+                    url, avatar, published, price, rate, area, living_area, 
+                    kitchen_area, rooms, floor, total_floor, ceiling_height, 
+                    geolocation_id, is_visible
+                ) 
+                SELECT $1::varchar, $2::varchar, $3::date, $4::numeric, 
+                $5::numeric, $6::float8, $7::float8, $8::float8, 
+                $9::smallint, $10::smallint, $11::smallint, $12::float8, 
+                $13::integer, $14::boolean 
+                WHERE NOT EXISTS (SELECT 1 FROM flats WHERE url = $1) 
+                AND NOT EXISTS (
+                    SELECT 1 FROM flats 
+                    WHERE geolocation_id = $13 AND rooms = $9 AND 
+                    floor = $10 AND total_floor = $11
+                ) 
+                RETURNING id, price, rate
+            ), prices AS (
+                INSERT INTO flat_prices (flat_id, price, rate, observed_at) 
+                SELECT id, price, rate, coalesce($15::timestamptz, now()) 
+                FROM inserted
+            ) 
+            SELECT id FROM inserted
+        ''',
+        'update_flat_details': '''
+            WITH deleted AS (
+                DELETE FROM flats_details 
+                WHERE flat_id = $1 AND detail_id <> ALL ($2::integer[])
+            ) 
+            INSERT INTO flats_details (flat_id, detail_id) 
+            SELECT $1, d FROM unnest($2::integer[]) AS d 
+            ON CONFLICT DO NOTHING
+        '''
+    }
 
     async def _find_record(
         self, connection: Connection, struct: Flat
     ) -> Record:
-        return await connection.fetchrow(
-            '''
-            SELECT f.id, price, geolocation_id 
-            FROM flats f JOIN geolocations g ON geolocation_id = g.id
-            WHERE url = $1 OR rooms = $2 AND floor = $3 AND 
-            total_floor = $4 AND abs(area - $5) <= $6 AND 
-            st_distance_sphere(
-                point, st_setsrid(st_point($7, $8), 4326)
-            ) <= $9
-            ''',
+        return await self._query(
+            connection, 'find_flat', 'fetchrow',
             struct.url, struct.rooms, struct.floor,
             struct.total_floor, struct.area, self.__area_tolerance,
             struct.geolocation['point'][0], struct.geolocation['point'][1],
             self.__distance_tolerance
         )
 
+    async def _find_records(
+        self, connection: Connection, structs: List[Flat]
+    ) -> List[Optional[Record]]:
+        """
+        Sends all flats in a single round trip: URL duplicates are found
+        via URL's index and spatial ones - via geography's GiST index.
+
+        :param connection: DB connection
+        :param structs: target entities to be checked
+        :return: duplicated records (or Nones) in the structs' order
+        """
+        records = await self._query(
+            connection, 'find_flats', 'fetch',
+            [s.url for s in structs], [s.rooms for s in structs],
+            [s.floor for s in structs], [s.total_floor for s in structs],
+            [s.area for s in structs],
+            [s.geolocation['point'][0] for s in structs],
+            [s.geolocation['point'][1] for s in structs],
+            self.__area_tolerance, self.__distance_tolerance
+        )
+        found = {r['i']: r for r in records}
+        return [found.get(i) for i in range(1, len(structs) + 1)]
+
     async def _update_record(
         self, connection: Connection, flat: Record, struct: Flat
     ):
-        if flat['price'] > struct.price:
-            await self.__delete_flat_details(connection, flat)
-            await self._set_estate_details(connection, flat, struct.details)
-            await self.__update_flat(connection, flat, struct)
-            await self._scribbler.add('updated')
-        else:
-            await self._scribbler.add('duplicated')
+        await self._update_records(connection, [(flat, struct)])
 
-    @staticmethod
-    async def __delete_flat_details(connection: Connection, flat: Record):
+    async def _update_records(
+        self, connection: Connection, duplicates: List[Tuple[Record, Flat]]
+    ):
         """
-        Deletes obsolete connections between flat's record and
-        details' records.
+        Rewrites flats whose duplicates are cheaper and appends all changed
+        prices to the flats' price history at once (as observed at the
+        offers' fetches, which may be replayed from the markup archive).
+
+        :param connection: DB connection
+        :param duplicates: target DB rows and their possible data replacers
+        """
+        updated = 0
+        for flat, struct in duplicates:
+            if flat['price'] > struct.price:
+                await self.__update_flat_details(connection, flat, struct)
+                await self.__update_flat(connection, flat, struct)
+                updated += 1
+        now = datetime.now(timezone.utc)
+        prices = [
+            (f['id'], s.price, s.rate, s.observed or now) for f, s in duplicates
+            if f['price'] != s.price
+        ]
+        if len(prices) > 0:
+            await connection.copy_records_to_table(
+                'flat_prices', records=prices,
+                columns=('flat_id', 'price', 'rate', 'observed_at')
+            )
+        await self._scribbler.add('updated', updated)
+        await self._scribbler.add('duplicated', len(duplicates) - updated)
+
+    async def __update_flat_details(
+        self, connection: Connection, flat: Record, struct: Flat
+    ):
+        """
+        Binds flat's record to the new details' records, keeping the
+        still actual connections and deleting only obsolete ones.
 
         :param connection: DB connection
         :param flat: target entity to be updated
+        :param struct: replacement DTO
         """
-        await connection.execute(
-            'DELETE FROM flats_details WHERE flat_id = $1', flat['id']
+        await self._query(
+            connection, 'update_flat_details', 'fetch',
+            flat['id'], self._find_details(struct.details)
         )
 
-    @staticmethod
     async def __update_flat(
-        connection: Connection, flat: Record, struct: Flat
+        self, connection: Connection, flat: Record, struct: Flat
     ):
         """
         Rewrites existing record, setting attributes that changes from
@@ -314,14 +794,8 @@ class FlatRepository(EstateRepository):
         :param flat: target entity to be updated
         :param struct: replacement DTO
         """
-        await connection.execute(
-            '''
-            UPDATE flats SET 
-            url = $1, avatar = $2, published = $3, price = $4, 
-            rate = $5, area = $6, living_area = $7, kitchen_area = $8, 
-            ceiling_height = $9 
-            WHERE id = $10
-            ''',
+        await self._query(
+            connection, 'update_flat', 'fetch',
             struct.url, struct.avatar, struct.published, struct.price,
             struct.rate, struct.area, struct.living_area,
             struct.kitchen_area, struct.ceiling_height, flat['id']
@@ -330,28 +804,362 @@ class FlatRepository(EstateRepository):
     async def _create_estate(
         self, connection: Connection, struct: Flat, geolocation: Record
     ) -> Record:
-        return await connection.fetchrow(
-            '''
-            INSERT INTO flats (
-                url, avatar, published, price, rate, area, living_area, 
-                kitchen_area, rooms, floor, total_floor, ceiling_height, 
-                geolocation_id, is_visible
-            ) VALUES (
-                $1, $2, $3, $4, $5, $6, $7, $8, $9, $10, $11, $12, $13, $14
-            ) RETURNING id
-            ''',
+        await self._query(connection, 'lock_flat_url', 'fetch', struct.url)
+        await self._query(
+            connection, 'lock_flat_place', 'fetch', geolocation['id'],
+            struct.rooms, struct.floor, struct.total_floor
+        )
+        flat = await self._query(
+            connection, 'create_flat', 'fetchrow',
             struct.url, struct.avatar, struct.published, struct.price,
             struct.rate, struct.area, struct.living_area, struct.kitchen_area,
             struct.rooms, struct.floor, struct.total_floor,
-            struct.ceiling_height, geolocation['id'], True
+            struct.ceiling_height, geolocation['id'], True, struct.observed
+        )
+        if flat is None:
+            raise UniqueViolationError(f'{struct.url} is already stored')
+        return flat
+
+    async def _stage_estates(self, connection: Connection, structs: List[Flat]):
+        await connection.execute(
+            '''
+            CREATE TEMPORARY TABLE IF NOT EXISTS staging_flats (
+                i integer, url varchar(400), avatar varchar(400), 
+                published date, price numeric(10, 2), rate numeric(10, 2), 
+                area float8, living_area float8, kitchen_area float8, 
+                rooms smallint, floor smallint, total_floor smallint, 
+                ceiling_height float8, observed timestamptz
+            ) ON COMMIT DELETE ROWS
+            '''
+        )
+        await connection.copy_records_to_table(
+            'staging_flats',
+            records=[
+                (
+                    i, s.url, s.avatar, s.published, s.price, s.rate, s.area,
+                    s.living_area, s.kitchen_area, s.rooms, s.floor,
+                    s.total_floor, s.ceiling_height, s.observed
+                )
+                for i, s in enumerate(structs)
+            ]
+        )
+
+    async def _merge_estates(self, connection: Connection) -> List[Record]:
+        """
+        Inserts staged flats which aren't duplicates. The partitioned
+        table's unique constraints have to include the publication date,
+        so they can keep neither URLs nor flats' places (geolocation,
+        rooms, floor & total floor) unique across the months. Instead,
+        the URLs and the places are locked till the commit and the flats
+        whose URLs or places are already stored are skipped.
+
+        :param connection: DB connection
+        :return: newly created flats' records (ids & urls)
+        """
+        await connection.execute(
+            '''
+            SELECT pg_advisory_xact_lock(hashtext('flats'), hashtext(url)) 
+            FROM (SELECT DISTINCT url FROM staging_flats ORDER BY url) AS l
+            '''
+        )
+        await connection.execute(
+            '''
+            SELECT pg_advisory_xact_lock(hashtext('flat_places'), hashtext(place)) 
+            FROM (
+                SELECT DISTINCT concat_ws(',', g.id, rooms, floor, total_floor) 
+                AS place 
+                FROM staging_flats s 
+                JOIN staging_geolocations sg USING (i) 
+                JOIN geolocations g 
+                ON g.point = st_setsrid(st_point(sg.lon, sg.lat), 4326) 
+                ORDER BY place
+            ) AS l
+            '''
+        )
+        return await connection.fetch(
+            '''
+            WITH inserted AS (
+                INSERT INTO flats (
+                    url, avatar, published, price, rate, area, living_area, 
+                    kitchen_area, rooms, floor, total_floor, ceiling_height, 
+                    geolocation_id, is_visible
+                ) 
+                SELECT s.url, avatar, published, price, rate, area, 
+                living_area, kitchen_area, rooms, floor, total_floor, 
+                ceiling_height, g.id, TRUE 
+                FROM staging_flats s 
+                JOIN staging_geolocations sg USING (i) 
+                JOIN geolocations g 
+                ON g.point = st_setsrid(st_point(sg.lon, sg.lat), 4326) 
+                WHERE NOT EXISTS (SELECT 1 FROM flats f WHERE f.url = s.url) 
+                AND NOT EXISTS (
+                    SELECT 1 FROM flats f 
+                    WHERE f.geolocation_id = g.id AND f.rooms = s.rooms AND 
+                    f.floor = s.floor AND f.total_floor = s.total_floor
+                ) 
+                AND s.i = (SELECT min(i) FROM staging_flats d WHERE d.url = s.url) 
+                AND s.i = (
+                    SELECT min(d.i) FROM staging_flats d 
+                    JOIN staging_geolocations dg USING (i) 
+                    WHERE dg.lon = sg.lon AND dg.lat = sg.lat AND 
+                    d.rooms = s.rooms AND d.floor = s.floor AND 
+                    d.total_floor = s.total_floor
+                ) 
+                ORDER BY s.i 
+                ON CONFLICT DO NOTHING 
+                RETURNING id, url, price, rate
+            ), prices AS (
+                INSERT INTO flat_prices (flat_id, price, rate, observed_at) 
+                SELECT f.id, f.price, f.rate, coalesce(s.observed, now()) 
+                FROM inserted f JOIN staging_flats s ON s.i = (
+                    SELECT min(i) FROM staging_flats d WHERE d.url = f.url
+                )
+            ) 
+            SELECT id, url FROM inserted
+            '''
+        )
+
+    async def _merge_estate_details(
+        self, connection: Connection, flats: List[Record]
+    ):
+        await connection.execute(
+            '''
+            INSERT INTO flats_details (flat_id, detail_id) 
+            SELECT DISTINCT f.id, sd.detail_id 
+            FROM unnest($1::integer[], $2::varchar[]) AS f(id, url) 
+            JOIN staging_flats s ON s.url = f.url 
+            JOIN staging_details sd ON sd.i = s.i
+            ''',
+            [f['id'] for f in flats], [f['url'] for f in flats]
         )
 
     async def _create_estate_details(
-        self, connection: Connection, flat: Record, details: List[Record]
+        self, connection: Connection, flat: Record, details: List[int]
     ):
         await connection.executemany(
             '''
             INSERT INTO flats_details (flat_id, detail_id) VALUES ($1, $2)
             ''',
-            [(flat['id'], d['id']) for d in details]
+            [(flat['id'], d) for d in details]
+        )
+
+
+class PartitionRepository(Repository):
+    """
+    Maintenance repository of the table which is range-partitioned by
+    months. Future partitions are created in advance (so that rows never
+    go to the default partition) and obsolete ones are detached and moved
+    into the archive's schema. Partitions' names look like
+    `<table>_y<year>m<month>` and the default one is `<table>_default`.
+
+    Class properties:
+        _table: partitioned table's name
+        _key: partitioning column's name
+        _archive: archived partitions' schema
+        _dependants: referencing columns of the dependant tables by the
+        tables' names (their rows follow the archived rows)
+    """
+    _table = None
+    _key = None
+    _archive = 'archive'
+    _dependants: Dict[str, str] = {}
+
+    @transactional('couldn\'t create partitions')
+    async def create_partitions(
+        self, connection: Connection, months: int
+    ) -> List[str]:
+        """
+        Creates partitions of the current month and of the next ones.
+
+        :param connection: DB connection
+        :param months: number of the next months
+        :return: newly created partitions' names
+        """
+        partitions = await self.__find_partitions(connection)
+        created = []
+        for record in await connection.fetch(
+            '''
+            SELECT (
+                date_trunc('month', now()) + make_interval(months => m)
+            )::date AS month 
+            FROM generate_series(0, $1) AS m
+            ''',
+            months
+        ):
+            if record['month'] not in partitions.values():
+                created.append(
+                    await self.__create_partition(connection, record['month'])
+                )
+        return created
+
+    async def __create_partition(self, connection: Connection, month: date) -> str:
+        """
+        Creates the month's partition. The default partition can't hold
+        the rows of the new partition's month, so if it does, it's detached
+        for a while and the rows are moved into the new partition through
+        the table (so the rows keep their ids and dependants).
+
+        :param connection: DB connection
+        :param month: partition month's first day
+        :return: partition's name
+        """
+        default = f'{self._table}_default'
+        bounds = (
+            f'{self._key} >= $1::date AND '
+            f'{self._key} < $1::date + interval \'1 month\''
+        )
+        stray = await connection.fetchval(
+            f'SELECT EXISTS (SELECT 1 FROM {default} WHERE {bounds})', month
+        )
+        if stray:
+            await connection.execute(
+                f'ALTER TABLE {self._table} DETACH PARTITION {default}'
+            )
+        name = await connection.fetchval(
+            f'SELECT create_{self._table}_partition($1)', month
+        )
+        if stray:
+            await connection.execute(
+                f'INSERT INTO {self._table} SELECT * FROM {default} '
+                f'WHERE {bounds}',
+                month
+            )
+            await connection.execute(
+                f'DELETE FROM {default} WHERE {bounds}', month
+            )
+            await connection.execute(
+                f'ALTER TABLE {self._table} ATTACH PARTITION {default} DEFAULT'
+            )
+        return name
+
+    @transactional('couldn\'t archive partitions')
+    async def archive_partitions(
+        self, connection: Connection, before: date
+    ) -> List[str]:
+        """
+        Detaches partitions of the months before the date and moves them
+        into the archive. The dependants' rows of the archived rows are
+        moved into the archive's copies of their tables, so they don't
+        stay behind as orphans (no trigger fires on detaching).
+
+        :param connection: DB connection
+        :param before: the first month to be kept
+        :return: archived partitions' names
+        """
+        partitions = await self.__find_partitions(connection)
+        archived = sorted(n for n, m in partitions.items() if m < before)
+        for name in archived:
+            await connection.execute(
+                f'ALTER TABLE {self._table} DETACH PARTITION {name}'
+            )
+            await connection.execute(
+                f'ALTER TABLE {name} SET SCHEMA {self._archive}'
+            )
+            for table, column in self._dependants.items():
+                await connection.execute(
+                    f'''
+                    CREATE TABLE IF NOT EXISTS {self._archive}.{table} 
+                    (LIKE {table})
+                    '''
+                )
+                await connection.execute(
+                    f'''
+                    WITH moved AS (
+                        DELETE FROM {table} 
+                        WHERE {column} IN (
+                            SELECT id FROM {self._archive}.{name}
+                        ) 
+                        RETURNING *
+                    ) 
+                    INSERT INTO {self._archive}.{table} SELECT * FROM moved
+                    '''
+                )
+        return archived
+
+    async def __find_partitions(self, connection: Connection) -> Dict[str, date]:
+        """
+        Finds all monthly partitions of the table.
+
+        :param connection: DB connection
+        :return: partitions' first days by their names
+        """
+        pattern = compile(rf'^{self._table}_y(\d{{4}})m(\d{{2}})$')
+        partitions = {}
+        for record in await connection.fetch(
+            '''
+            SELECT c.relname FROM pg_inherits i 
+            JOIN pg_class c ON c.oid = i.inhrelid 
+            WHERE i.inhparent = $1::regclass
+            ''',
+            self._table
+        ):
+            match = pattern.match(record['relname'])
+            if match is not None:
+                partitions[record['relname']] = date(
+                    int(match.group(1)), int(match.group(2)), 1
+                )
+        return partitions
+
+
+class FlatPartitionRepository(PartitionRepository):
+    """
+    Maintenance repository of the flats' monthly partitions.
+    """
+    _table = 'flats'
+    _key = 'published'
+    _dependants = {
+        'flats_details': 'flat_id',
+        'flat_prices': 'flat_id',
+        'core_user_saved_flats': 'flat_id'
+    }
+
+
+class OsmRepository(Repository):
+    """
+    Maintenance repository of the offline geolocator's OSM tables. They're
+    refilled from the tables of the OSM extract's import by osm2pgsql (made
+    with `--latlong`, so the geometries are already in WGS 84): named
+    administrative boundaries become the geolocator's boundaries (told
+    apart by their admin levels) and named highways become its roads.
+
+    Class properties:
+        _kinds: boundaries' kinds by their OSM admin levels
+        _name_length: max length of the boundaries' & roads' names
+    """
+    _kinds = {
+        '4': 'state', '6': 'county', '8': 'locality',
+        '9': 'neighbourhood', '10': 'neighbourhood'
+    }
+    _name_length = 128
+
+    @transactional('couldn\'t load OSM extract')
+    async def load(self, connection: Connection) -> int:
+        """
+        Replaces the boundaries & roads with the imported ones.
+
+        :param connection: DB connection
+        :return: number of the loaded boundaries & roads
+        """
+        await connection.execute('TRUNCATE TABLE osm_boundaries, osm_roads')
+        boundaries = await connection.execute(
+            '''
+            INSERT INTO osm_boundaries (name, kind, geometry) 
+            SELECT left(name, $1), k.kind, st_multi(way) 
+            FROM planet_osm_polygon 
+            JOIN unnest($2::varchar[], $3::varchar[]) AS k(level, kind) 
+            ON admin_level = k.level 
+            WHERE boundary = 'administrative' AND name IS NOT NULL
+            ''',
+            self._name_length, list(self._kinds), list(self._kinds.values())
+        )
+        roads = await connection.execute(
+            '''
+            INSERT INTO osm_roads (name, geometry) 
+            SELECT left(name, $1), st_multi(way) FROM planet_osm_line 
+            WHERE highway IS NOT NULL AND name IS NOT NULL
+            ''',
+            self._name_length
         )
+        await connection.execute('ANALYZE osm_boundaries')
+        await connection.execute('ANALYZE osm_roads')
+        return int(boundaries.split()[-1]) + int(roads.split()[-1])
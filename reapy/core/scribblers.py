@@ -79,8 +79,11 @@ class ReaperScribbler(Scribbler):
     that's why their reports contain many shapes concernedly
     inserted/duplicated/invalid data.
     """
-    _fields = ('inserted', 'updated', 'duplicated', 'unlocated', 'written')
-    _defaults = (0, 0, 0, 0, None)
+    _fields = (
+        'inserted', 'updated', 'duplicated', 'unlocated',
+        'geocached', 'geocoded', 'retried', 'failed', 'written'
+    )
+    _defaults = (0, 0, 0, 0, 0, 0, 0, 0, None)
 
 
 class SweeperScribbler(Scribbler):
@@ -89,5 +92,15 @@ class SweeperScribbler(Scribbler):
     statistics. Mainly, sweepers delete junk and expired data so that their
     scribbles contain mainly data concernedly deletions.
     """
-    _fields = ('discarded', 'unresponded', 'written')
+    _fields = ('discarded', 'unresponded', 'retried', 'failed', 'written')
+    _defaults = (0, 0, 0, 0, None)
+
+
+class KeeperScribbler(Scribbler):
+    """
+    This scribbler is specialized on the :class:`core.keepers.Keeper`'s
+    statistics. Keepers maintain the DB's structure, so their scribbles
+    contain numbers of the created & archived DB objects.
+    """
+    _fields = ('created', 'archived', 'written')
     _defaults = (0, 0, None)
@@ -4,7 +4,7 @@ This module describes *reapy*'s DTOs
 Structs are simple classes without any behaviour (like C++ structs) whose
 single task is to transfer the data in a convenient way with the dot-notation.
 """
-from datetime import date
+from datetime import date, datetime
 from decimal import Decimal
 from typing import List, Dict, Any
 from attr import attrs, attrib
@@ -31,6 +31,8 @@ class Flat(object):
         total_floor: flat's house total_floor
         ceiling_height: flat's ceiling_height (in meters)
         details: details' list (flat's literal description)
+        observed: moment of the offer's fetch if it isn't now (e.g. the
+        offer's replayed from the markup archive)
     """
     url = attrib(default=None, type=str)
     avatar = attrib(default=None, type=str)
@@ -47,3 +49,4 @@ class Flat(object):
     total_floor = attrib(default=None, type=int)
     ceiling_height = attrib(default=None, type=float)
     details = attrib(default=[], type=List[str])
+    observed = attrib(default=None, type=datetime)
@@ -1,22 +1,87 @@
+"""
+This module describes cleaning workers - sweepers
+
+Offers expire, but their rows stay in the DB and would be served forever.
+Sweepers walk through the visible offers of their site, fetch the offers'
+pages again and hide the obsolete ones, so they aren't looked up anymore.
+"""
+from typing import Any, AsyncIterator, Dict, Optional
+from asyncpg import Record
+from core.clixes import StreamingClix
 from core.scribblers import SweeperScribbler
 from core.crawlers import OlxFlatCrawler, DomRiaFlatCrawler
 from core.parsers import OlxFlatParser, DomRiaFlatParser
 from core.repositories import FlatRepository
-from core.workers import Worker
+from core.workers import Worker, parse_junk
 from core.decorators import measurable
 
 
+def _find_junk(offer: Dict[str, Any]) -> Optional[int]:
+    """
+    Checks the offer's obsolescence inside an executor's process.
+
+    :param offer: dict with 'id', 'url' & 'markup' fields
+    :return: offer's id if it's obsolete and None otherwise
+    """
+    if parse_junk(offer) is not None:
+        return offer['id']
+
+
 class Sweeper(Worker):
+    """
+    Obsolete offers' cleaner. Visible offers are streamed from the DB by
+    the server-side cursor, their pages are checked concurrently and the
+    obsolete ones are hidden by chunks.
+
+    Class properties:
+        _url_prefix: regex of the site's offers' URLs
+        _timeout: offer page's request timeout
+        _chunk_size: number of offers hidden via a single DB query
+    """
     _scribbler_class = SweeperScribbler
     _url_prefix = None
     _timeout = 10
+    _chunk_size = 100
 
     @measurable('sweep')
     async def _work(self):
-        pass
+        await (
+            StreamingClix(self._find_offers, self._executor)
+            .reform(self._get_offer)
+            .sieve(_find_junk)
+            .chunk(self._chunk_size)
+            .apply(self._repository.hide_many)
+        )
+
+    async def _find_offers(self) -> AsyncIterator[Record]:
+        """
+        Opens the stream of the site's visible offers.
+
+        :return: offers' ids & URLs
+        """
+        return self._repository.find_visible(self._url_prefix)
+
+    async def _get_offer(self, record: Record) -> Optional[Dict[str, Any]]:
+        """
+        Fetches the offer's page.
+
+        :param record: offer's id & URL
+        :return: dict with 'id', 'url' & 'markup' fields or None if the
+        site didn't respond
+        """
+        offer = await self._crawler.get_markup(
+            {'id': record['id'], 'url': record['url']}, timeout=self._timeout
+        )
+        if offer['markup'] is None:
+            await self._scribbler.add('unresponded')
+            return None
+        return offer
 
 
 class OlxFlatSweeper(Sweeper):
+    """
+    Sweeper of the www.olx.ua flats.
+    """
     _repository_class = FlatRepository
     _crawler_class = OlxFlatCrawler
     _parser_class = OlxFlatParser
@@ -24,6 +89,9 @@ class OlxFlatSweeper(Sweeper):
 
 
 class DomRiaFlatSweeper(Sweeper):
+    """
+    Sweeper of the dom.ria.com flats.
+    """
     _repository_class = FlatRepository
     _crawler_class = DomRiaFlatCrawler
     _parser_class = DomRiaFlatParser
@@ -5,9 +5,11 @@ Worker - it's a generalization which can be launched via Cron to
 fulfil some data processing. They describe the common facade and
 each derivative implements the job contract.
 """
+from concurrent.futures.process import ProcessPoolExecutor
 from logging import basicConfig, getLogger, INFO
 from asyncio import run
 from os.path import join
+from typing import Any, Dict, List, Optional
 from uvloop import install
 from core import BASE_DIR, DEFAULT_DSN
 from core.crawlers import Crawler
@@ -18,6 +20,52 @@ from core.utils import snake_case
 
 logger = getLogger(__name__)
 
+# Pool process' own parser (set by the pool's initializer)
+_parser: Optional[Parser] = None
+
+
+def _warm(parser_class: type):
+    """
+    Prepares a fresh pool's process: imports parsers' module and instantiates
+    the parser, loading its detail dictionaries before the first task comes.
+
+    :param parser_class: worker's HTML processor class
+    """
+    global _parser
+    _parser = parser_class()
+
+
+def parse_page(markup: str) -> List[Dict[str, Any]]:
+    """
+    Parses the pagination page by the pool process' parser, so only
+    the function's name is pickled with the batch instead of the whole parser.
+
+    :param markup: HTML markup
+    :return: list of "raw offers"
+    """
+    return _parser.parse_page(markup)
+
+
+def parse_offer(offer: Dict[str, Any]) -> Optional[Any]:
+    """
+    Parses the offer by the pool process' parser.
+
+    :param offer: target dict with 'markup', 'url' and some other fields
+    :return: special data structure or None if the check failed
+    """
+    return _parser.parse_offer(offer)
+
+
+def parse_junk(offer: Dict[str, Any]) -> Optional[str]:
+    """
+    Checks the offer's obsolescence by the pool process' parser.
+
+    :param offer: target page's view
+    :return: offer's url if the page is junk (the offer's obsolete or gone)
+    and None otherwise
+    """
+    return _parser.parse_junk(offer)
+
 
 class Worker:
     """
@@ -34,6 +82,7 @@ class Worker:
     Instance properties:
         _name: worker's name
         _scribbler: shapes' statistician
+        _executor: long-lived process pool for CPU bound stages
         _crawler: networker
         _parser: HTML processor
         _repository: DB accessor
@@ -74,18 +123,25 @@ class Worker:
 
     async def __run(self):
         """
-        Event loop's entry point.
+        Event loop's entry point. Opened resources are spared even if
+        the work fails (e.g. the crawler's arena with the unread pages).
         """
         await self._prepare()
-        await self._work()
-        await self._spare()
+        try:
+            await self._work()
+        finally:
+            await self._spare()
 
     async def _prepare(self):
         """
         Creates all working units and opens some resources if needed.
         """
-        self._crawler = self._crawler_class()
+        self._crawler = self._crawler_class(self._scribbler)
         await self._crawler.prepare()
+        # the pool is forked after the crawler to share its memory arena
+        self._executor = ProcessPoolExecutor(
+            initializer=_warm, initargs=(self._parser_class,)
+        )
         self._parser = self._parser_class()
         self._repository = self._repository_class(self._scribbler)
         await self._repository.prepare(DEFAULT_DSN)
@@ -102,3 +158,4 @@ class Worker:
         """
         await self._crawler.spare()
         await self._repository.spare()
+        self._executor.shutdown()
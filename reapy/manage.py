@@ -22,7 +22,12 @@ Inappropriate worker's name causes error.
 from sys import argv
 from importlib import import_module
 
-modules = (import_module('core.reapers'), import_module('core.sweepers'))
+modules = (
+    import_module('core.reapers'),
+    import_module('core.reparsers'),
+    import_module('core.sweepers'),
+    import_module('core.keepers')
+)
 
 if __name__ == '__main__':
     for module in modules:
@@ -39,4 +39,7 @@ __run_worker(
     minutes=[9, 17, 25, 40, 48, 56],
     hours=[19, 20, 21, 22, 23, 0, 1, 2, 3, 4, 5, 6, 7]
 )
+__run_worker('OlxFlatSweeper', minutes=[15], hours=[10])
+__run_worker('DomRiaFlatSweeper', minutes=[15], hours=[13])
+__run_worker('FlatPartitionKeeper', minutes=[30], hours=[18])
 cron.write()
@@ -0,0 +1,83 @@
+from datetime import timezone
+from os import listdir
+from time import time
+from typing import Type
+from pytest import fixture, mark
+from core.archives import MarkupArchive
+from core.crawlers import EstateCrawler
+
+
+@fixture
+def archive(tmp_path) -> MarkupArchive:
+    archive = MarkupArchive(str(tmp_path / 'archive'))
+    archive.open()
+    yield archive
+    archive.close()
+
+
+def test_put_and_read(archive: MarkupArchive):
+    archive.put('https://www.olx.ua/1', 'Привіт'.encode(), 'utf-8', {'area': 40})
+    archive.put('https://www.olx.ua/2', 'Привіт'.encode(), 'utf-8')
+    archive.put('https://www.olx.ua/1', b'changed', 'utf-8', {'area': 41})
+    fetches = sorted(archive.fetches(0))
+    assert [(f[0], f[2], f[3]) for f in fetches] == [
+        ('https://www.olx.ua/1', 'utf-8', {'area': 41}),
+        ('https://www.olx.ua/2', 'utf-8', {})
+    ]
+    assert archive.read(fetches[0][1]) == b'changed'
+    assert archive.read(fetches[1][1]).decode() == 'Привіт'
+    assert archive.read('absent') is None
+    assert len(list(archive.fetches(2 ** 32))) == 0
+
+
+def test_segments(archive: MarkupArchive):
+    archive._segment_size = 1
+    for i in range(3):
+        archive.put(f'https://dom.ria.com/{i}', f'body {i}'.encode(), 'utf-8')
+    assert sorted(n for n in listdir(archive._folder) if n.endswith('.zst')) \
+        == ['000000.zst', '000001.zst', '000002.zst']
+    assert {archive.read(f[1]) for f in archive.fetches(0)} == {
+        b'body 0', b'body 1', b'body 2'
+    }
+
+
+def test_eviction(tmp_path):
+    archive = MarkupArchive(str(tmp_path / 'archive'))
+    archive._segment_size = 1
+    archive.open()
+    for i in range(3):
+        archive.put(f'https://dom.ria.com/{i}', f'body {i}'.encode(), 'utf-8')
+    archive._max_age = -1
+    archive.close()
+    assert not any(n.endswith('.zst') for n in listdir(archive._folder))
+    archive.open()
+    assert len(list(archive.fetches(0))) == 0
+    archive.put('https://dom.ria.com/0', b'body 0', 'utf-8')
+    assert archive.read(next(archive.fetches(0))[1]) == b'body 0'
+    archive.close()
+
+
+@fixture
+def crawler_class(tmp_path) -> Type[EstateCrawler]:
+    return type(
+        'ArchivedCrawler', (EstateCrawler,),
+        {'_archive_path': str(tmp_path / 'archive')}
+    )
+
+
+@mark.asyncio
+async def test_get_archived_offers(crawler_class: Type[EstateCrawler]):
+    crawler = crawler_class()
+    await crawler.prepare()
+    await crawler._run_archive(  # noqa
+        crawler._archive.put,  # noqa
+        'https://www.olx.ua/1', 'Київ'.encode('cp1251'), 'cp1251', {'area': 40}
+    )
+    offers = [o async for o in crawler.get_archived_offers(0)]
+    assert len(offers) == 1
+    assert offers[0]['url'] == 'https://www.olx.ua/1'
+    assert offers[0]['area'] == 40
+    assert offers[0]['observed'].tzinfo is timezone.utc
+    assert abs(offers[0]['observed'].timestamp() - time()) < 60
+    assert offers[0]['markup'].read() == 'Київ'
+    await crawler.spare()
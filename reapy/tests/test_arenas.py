@@ -0,0 +1,74 @@
+from concurrent.futures.process import ProcessPoolExecutor
+from pytest import fixture, raises
+from core.arenas import Arena, Slice, unwrap
+from core.parsers import OlxFlatParser
+from core.utils import read
+
+
+class TinyArena(Arena):
+    _slot_size = 16
+    _slots = 2
+
+
+@fixture
+def arena() -> Arena:
+    arena = TinyArena()
+    yield arena
+    arena.close()
+
+
+def test_write_and_read(arena: Arena):
+    piece = arena.write('Привіт'.encode(), 'utf-8')
+    assert isinstance(piece, Slice)
+    assert piece.length == 12
+    assert unwrap(piece) == 'Привіт'
+    assert unwrap('plain') == 'plain'
+
+
+def test_overflow(arena: Arena):
+    assert arena.write(b'x' * 17, 'utf-8') is None
+    first = arena.write(b'first', 'utf-8')
+    second = arena.write(b'second', 'utf-8')
+    assert arena.write(b'third', 'utf-8') is None
+    assert first.read() == 'first'
+    third = arena.write(b'third', 'utf-8')
+    assert third.slot == first.slot
+    assert second.read() == 'second'
+    assert third.read() == 'third'
+
+
+def test_slots():
+    arena = TinyArena(3)
+    try:
+        pieces = [arena.write(b'x', 'utf-8') for _ in range(3)]
+        assert [p.slot for p in pieces] == [0, 1, 2]
+        assert arena.write(b'y', 'utf-8') is None
+        pieces[1].read()
+        pieces[0].read()
+        assert arena.write(b'z', 'utf-8').slot == 0
+    finally:
+        arena.close()
+
+
+def test_closed(arena: Arena):
+    piece = arena.write(b'lost', 'utf-8')
+    arena.close()
+    with raises(KeyError):
+        piece.read()
+
+
+def test_forked_read():
+    arena = Arena()
+    executor = ProcessPoolExecutor(2)
+    try:
+        markup = read('fixtures/test_parse_offer/olx_flat0.html')
+        expected = OlxFlatParser().parse_offer({'url': 'url', 'markup': markup})
+        pieces = [arena.write(markup.encode(), 'utf-8') for _ in range(4)]
+        assert list(executor.map(
+            OlxFlatParser().parse_offer,
+            [{'url': 'url', 'markup': p} for p in pieces]
+        )) == [expected] * 4
+        assert arena._memory[:4] == bytes(4)  # noqa
+    finally:
+        executor.shutdown()
+        arena.close()
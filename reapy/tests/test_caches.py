@@ -0,0 +1,138 @@
+from typing import Type
+from aiohttp.web import Application, AppRunner, Request, Response, TCPSite
+from pytest import fixture, mark
+from core.caches import HttpCache, GeocodingCache
+from core.crawlers import Crawler
+
+
+@fixture
+def cache(tmp_path) -> HttpCache:
+    cache = HttpCache(str(tmp_path / 'cache.sqlite3'))
+    cache.open()
+    yield cache
+    cache.close()
+
+
+def test_put_and_get(cache: HttpCache):
+    assert cache.get('https://www.olx.ua/') is None
+    cache.put('https://www.olx.ua/', 'Привіт'.encode(), 'utf-8', '"v1"', None)
+    entry = cache.get('https://www.olx.ua/')
+    assert entry.body.decode(entry.encoding) == 'Привіт'
+    assert entry.validators == {'If-None-Match': '"v1"'}
+    assert entry.digest == cache.digest('Привіт'.encode())
+
+
+def test_expiration(cache: HttpCache):
+    cache._max_age = -1
+    cache.put('https://dom.ria.com/', b'body', 'utf-8', None, 'Mon, 1 Jan')
+    assert cache.get('https://dom.ria.com/') is None
+
+
+def test_pending(cache: HttpCache):
+    cache.put('https://www.olx.ua/', b'body', 'utf-8', '"v1"', None, True)
+    assert cache.get('https://www.olx.ua/') is None
+    cache.confirm(['https://www.olx.ua/', 'https://dom.ria.com/'])
+    assert cache.get('https://www.olx.ua/').body == b'body'
+    cache.put('https://dom.ria.com/', b'body', 'utf-8', '"v1"', None, True)
+    cache._evict()  # noqa
+    cache.confirm(['https://dom.ria.com/'])
+    assert cache.get('https://dom.ria.com/') is None
+
+
+@fixture
+def geocoding_cache(tmp_path) -> GeocodingCache:
+    cache = GeocodingCache(str(tmp_path / 'geocoding.sqlite3'))
+    cache.open()
+    yield cache
+    cache.close()
+
+
+def test_geocoding_keys(geocoding_cache: GeocodingCache):
+    assert geocoding_cache.key((30.5234001, 50.4501)) == \
+        'point:30.52340,50.45010'
+    assert geocoding_cache.key(address=' Київ, ,  Печерський  ,вул. Січових ') \
+        == 'address:київ, печерський, вул. січових'
+    assert geocoding_cache.key((30.5, 50.4), 'Київ') == 'point:30.50000,50.40000'
+
+
+def test_geocoding_put_and_get(geocoding_cache: GeocodingCache):
+    assert geocoding_cache.get('address:київ') == (False, None)
+    geocoding_cache.put('address:київ', {'lat': '50.45', 'lon': '30.52'})
+    assert geocoding_cache.get('address:київ') == (
+        True, {'lat': '50.45', 'lon': '30.52'}
+    )
+    geocoding_cache.put('address:нікуди', None)
+    assert geocoding_cache.get('address:нікуди') == (True, None)
+    geocoding_cache._negative_ttl = -1
+    geocoding_cache.put('address:нікуди', None)
+    assert geocoding_cache.get('address:нікуди') == (False, None)
+
+
+async def tagged(request: Request) -> Response:
+    if request.headers.get('If-None-Match') == '"v1"':
+        return Response(status=304)
+    return Response(text='tagged', headers={'ETag': '"v1"'})
+
+
+async def untagged(_: Request) -> Response:
+    return Response(text='untagged')
+
+
+async def serve(port: int) -> AppRunner:
+    application = Application()
+    application.router.add_get('/tagged', tagged)
+    application.router.add_get('/untagged', untagged)
+    runner = AppRunner(application)
+    await runner.setup()
+    await TCPSite(runner, '127.0.0.1', port).start()
+    return runner
+
+
+@fixture
+def crawler_class(tmp_path) -> Type[Crawler]:
+    return type(
+        'CachedCrawler', (Crawler,),
+        {'_cache_path': str(tmp_path / 'cache.sqlite3')}
+    )
+
+
+@mark.asyncio
+async def test_revalidate(
+    crawler_class: Type[Crawler], unused_tcp_port: int
+):
+    runner = await serve(unused_tcp_port)
+    server = f'http://127.0.0.1:{unused_tcp_port}'
+    crawler = crawler_class()
+    await crawler.prepare()
+    assert await crawler.revalidate(f'{server}/tagged') == (
+        b'tagged', 'utf-8', True
+    )
+    assert await crawler.revalidate(f'{server}/tagged') == (
+        b'tagged', 'utf-8', False
+    )
+    assert await crawler.get_text(f'{server}/tagged') == 'tagged'
+    assert (await crawler.revalidate(f'{server}/untagged'))[2]
+    assert not (await crawler.revalidate(f'{server}/untagged'))[2]
+    assert (await crawler.revalidate(f'{server}/tagged?pending', True))[2]
+    assert (await crawler.revalidate(f'{server}/tagged?pending', True))[2]
+    await crawler.confirm([f'{server}/tagged?pending'])
+    assert not (await crawler.revalidate(f'{server}/tagged?pending'))[2]
+    await crawler.spare()
+    await runner.cleanup()
+
+
+@mark.asyncio
+async def test_uncached(crawler_class: Type[Crawler], unused_tcp_port: int):
+    runner = await serve(unused_tcp_port)
+    server = f'http://127.0.0.1:{unused_tcp_port}'
+    crawler = crawler_class()
+    await crawler.prepare()
+    assert await crawler.get_body(f'{server}/tagged', False) == (
+        b'tagged', 'utf-8'
+    )
+    assert await crawler.get_body(f'{server}/tagged', False) == (
+        b'tagged', 'utf-8'
+    )
+    assert (await crawler.revalidate(f'{server}/tagged'))[2]
+    await crawler.spare()
+    await runner.cleanup()
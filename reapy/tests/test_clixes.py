@@ -1,6 +1,11 @@
-from typing import List, Tuple, Dict, Any, Optional
+from typing import List, Tuple, Dict, Any, Optional, Iterable, AsyncIterator
+from asyncio import sleep, wrap_future
+from concurrent.futures.process import ProcessPoolExecutor
+from concurrent.futures.thread import ThreadPoolExecutor
+from threading import Lock
+from time import sleep as block
 from pytest import mark, raises
-from core.clixes import Clix
+from core.clixes import Clix, StreamingClix
 from logging import disable
 
 
@@ -235,6 +240,20 @@ def to_int(value: str) -> int:
     return int(value)
 
 
+@mark.asyncio
+async def test_chunk():
+    assert await Clix(create_empty_tuple).chunk(2).list() == []
+    assert await Clix(create_str_list).map(strip).chunk(2).list() == [
+        ['Titiyo', 'Eminem'], ['Metallica', 'Madonna'], ['Lady Gaga']
+    ]
+    assert sorted(map(len, await (
+        StreamingClix(create_people_list, concurrency=3)
+        .flatten(lambda p: p['friends'])
+        .chunk(4)
+        .list()
+    ))) == [2, 4, 4, 4]
+
+
 @mark.asyncio
 async def test_erroneous_clix_flow():
     with raises(ValueError):
@@ -244,3 +263,156 @@ async def test_erroneous_clix_flow():
             .sieve(to_int)
             .list()
         )
+
+
+@mark.asyncio
+async def test_streaming_creation():
+    assert sorted(await StreamingClix(create_int_list).list()) == [
+        -18, 0, 3, 7, 10, 23
+    ]
+    assert [] == await StreamingClix(create_empty_tuple).list()
+    with raises(TypeError):
+        await StreamingClix(lambda: [3, -4, 0]).list()
+
+
+async def iterate_ints() -> AsyncIterator[int]:
+    for i in (23, 3, 7):
+        await sleep(0)
+        yield i
+
+
+async def create_int_stream() -> AsyncIterator[int]:
+    return iterate_ints()
+
+
+@mark.asyncio
+async def test_streaming_async_creation():
+    assert sorted(
+        await StreamingClix(create_int_stream).map(abs).list()
+    ) == [3, 7, 23]
+
+
+@mark.asyncio
+async def test_streaming_map_and_reform():
+    assert sorted(await StreamingClix(create_str_list).map(strip).list()) == [
+        'Eminem', 'Lady Gaga', 'Madonna', 'Metallica', 'Titiyo'
+    ]
+    assert sorted(await (
+        StreamingClix(create_city_list).reform(get_point, is_boxed).list()
+    )) == [(41.791, 44.256), (43.45, 44.0388), (46.013, 48.681)]
+    with raises(TypeError):
+        await StreamingClix(create_city_list).reform(get_population).list()
+
+
+@mark.asyncio
+async def test_streaming_friend_clix_flow():
+    assert sorted(await (
+        StreamingClix(create_people_list, buffer_size=2, concurrency=3)
+        .flatten(lambda p: p['friends'])
+        .distinct(lambda fn: fn)
+        .map(add_last_name)
+        .list()
+    )) == [
+        'Alex Jerico', 'Andrew Anduine', 'Andryi Anduine', 'Ann Coolant',
+        'Cinnamon Astarot', 'Danylo Anduine', 'Eugene Anduine', 'Helga Jerico',
+        'Michael Anduine', 'Olya Jerico', 'Timur Jerico'
+    ]
+
+
+@mark.asyncio
+async def test_streaming_erroneous_flow():
+    with raises(ValueError):
+        await (
+            StreamingClix(create_people_list)
+            .flatten(lambda p: p['friends'])
+            .sieve(to_int)
+            .list()
+        )
+    with raises(KeyError):
+        await (
+            StreamingClix(create_people_list)
+            .flatten(lambda p: p['enemies'])
+            .list()
+        )
+
+
+@mark.asyncio
+async def test_streaming_backpressure():
+    produced, consumed = [], []
+
+    async def create_range() -> Iterable[int]:
+        def generate():
+            for i in range(1000):
+                produced.append(i)
+                yield i
+        return generate()
+
+    async def consume(value: int) -> int:
+        consumed.append(value)
+        assert len(produced) - len(consumed) <= 4 * 5 + 4 * 3
+        await sleep(0)
+        return value
+
+    assert len(await (
+        StreamingClix(create_range, buffer_size=5, concurrency=3)
+        .reform(consume)
+        .list()
+    )) == 1000
+
+
+@mark.asyncio
+async def test_streaming_capacity():
+    clix_class = type(
+        'SmallClix', (StreamingClix,),
+        {'_buffer_size': 2, '_concurrency': 3, '_batch_size': 4}
+    )
+    lock, held, peaks = Lock(), [0], [0]
+
+    async def create_range() -> Iterable[int]:
+        return range(200)
+
+    async def hold(value: int) -> int:
+        with lock:
+            held[0] += 1
+            peaks[0] = max(peaks[0], held[0])
+        return value
+
+    def release(value: int) -> int:
+        block(0.001)
+        with lock:
+            held[0] -= 1
+        return value
+
+    executor = ThreadPoolExecutor(3)
+    try:
+        assert len(await (
+            clix_class(create_range, executor)
+            .reform(hold)
+            .sieve(release)
+            .list()
+        )) == 200
+    finally:
+        executor.shutdown()
+    assert peaks[0] <= clix_class.capacity()
+
+
+async def get_name(locality: Dict[str, Any]) -> str:
+    return locality['name']
+
+
+@mark.asyncio
+async def test_shared_executor_batches():
+    executor = ProcessPoolExecutor(2)
+    try:
+        assert await (
+            Clix(create_str_list, executor, batch_size=2).map(strip).list()
+        ) == ['Titiyo', 'Eminem', 'Metallica', 'Madonna', 'Lady Gaga']
+        assert sorted(await (
+            StreamingClix(create_city_list, executor, batch_size=4)
+            .sieve(get_locality, is_ukrainian_stateful_locality)
+            .reform(get_name)
+            .list()
+        )) == ['Одеса', 'Рівне', 'Харків', 'Черкаси']
+        assert await wrap_future(executor.submit(strip, ' alive ')) == 'alive'
+    finally:
+        executor.shutdown()
@@ -0,0 +1,88 @@
+from asyncio import gather, sleep
+from aiohttp.web import (
+    Application, AppRunner, Request, Response, TCPSite, json_response
+)
+from pytest import fixture, mark
+from core.crawlers import Crawler
+from core.scribblers import ReaperScribbler
+
+
+def flaky(failures: int):
+    async def handler(_: Request) -> Response:
+        handler.calls += 1
+        if handler.calls <= failures:
+            return Response(status=503)
+        return Response(text='flaky')
+    handler.calls = 0
+    return handler
+
+
+async def missing(_: Request) -> Response:
+    return Response(status=404, text='missing')
+
+
+def slow():
+    async def handler(_: Request) -> Response:
+        handler.calls += 1
+        await sleep(0.05)
+        return json_response({'calls': handler.calls})
+    handler.calls = 0
+    return handler
+
+
+async def serve(port: int) -> AppRunner:
+    application = Application()
+    application.router.add_get('/flaky', flaky(2))
+    application.router.add_get('/broken', flaky(100))
+    application.router.add_get('/missing', missing)
+    application.router.add_get('/slow', slow())
+    runner = AppRunner(application)
+    await runner.setup()
+    await TCPSite(runner, '127.0.0.1', port).start()
+    return runner
+
+
+class QuickCrawler(Crawler):
+    _backoff = 0.01
+    _retry_budget = 3
+
+
+@fixture
+def scribbler(tmp_path) -> ReaperScribbler:
+    return ReaperScribbler(str(tmp_path / 'scribble.csv'))
+
+
+@mark.asyncio
+async def test_retries(scribbler: ReaperScribbler, unused_tcp_port: int):
+    runner = await serve(unused_tcp_port)
+    server = f'http://127.0.0.1:{unused_tcp_port}'
+    crawler = QuickCrawler(scribbler)
+    await crawler.prepare()
+    assert await crawler.get_text(f'{server}/flaky') == 'flaky'
+    assert scribbler._row['retried'] == 2  # noqa
+    assert scribbler._row['failed'] == 0  # noqa
+    assert await crawler.get_text(f'{server}/missing') == 'missing'
+    assert await crawler.get_text(f'{server}/broken') is None
+    assert scribbler._row['retried'] == 3  # noqa
+    assert scribbler._row['failed'] == 1  # noqa
+    await crawler.spare()
+    await runner.cleanup()
+
+
+@mark.asyncio
+async def test_coalescing(unused_tcp_port: int):
+    runner = await serve(unused_tcp_port)
+    server = f'http://127.0.0.1:{unused_tcp_port}'
+    crawler = QuickCrawler()
+    await crawler.prepare()
+    assert await gather(*(
+        crawler.get_json(f'{server}/slow') for _ in range(5)
+    )) == [{'calls': 1}] * 5
+    assert await crawler.get_json(f'{server}/slow') == {'calls': 1}
+    assert await crawler.get_text(f'{server}/slow') == '{"calls": 2}'
+    assert await gather(
+        crawler.get_text(f'{server}/slow'),
+        crawler.get_text(f'{server}/slow', headers={'Accept': 'text/html'})
+    ) == ['{"calls": 4}'] * 2
+    await crawler.spare()
+    await runner.cleanup()
@@ -0,0 +1,77 @@
+from typing import Any, Dict, List
+from pytest import fixture, mark
+from core.geolocators import NominatimGeolocator, OsmGeolocator
+from core.scribblers import ReaperScribbler
+
+
+class FakeCrawler:
+    def __init__(self, responses: Dict[str, Any]):
+        self.responses = responses
+        self.urls: List[str] = []
+
+    async def get_json(self, url: str, **_: Any) -> Any:
+        self.urls.append(url)
+        return self.responses.get(url)
+
+
+@fixture
+def scribbler(tmp_path) -> ReaperScribbler:
+    return ReaperScribbler(str(tmp_path / 'scribble.csv'))
+
+
+@mark.asyncio
+async def test_locate_cached(tmp_path, scribbler: ReaperScribbler):
+    geocoding_url = NominatimGeolocator._geocoding_url  # noqa
+    crawler = FakeCrawler({
+        geocoding_url.format('Київ, Печерський'): [{'lat': '50.4'}],
+        geocoding_url.format('Нікуди'): []
+    })
+    geolocator_class = type(
+        'CachedGeolocator', (NominatimGeolocator,),
+        {'_cache_path': str(tmp_path / 'nominatim.sqlite3')}
+    )
+    geolocator = geolocator_class(scribbler, crawler)
+    await geolocator.prepare('')
+    for _ in range(2):
+        assert await geolocator.locate(
+            {'address': 'Київ, Печерський'}
+        ) == {'lat': '50.4'}
+        assert await geolocator.locate({'address': 'Нікуди'}) is None
+        assert await geolocator.locate({'address': 'Помилка'}) is None
+    assert len(crawler.urls) == 4
+    assert scribbler._row['geocached'] == 2  # noqa
+    assert scribbler._row['geocoded'] == 4  # noqa
+    assert scribbler._row['unlocated'] == 4  # noqa
+    await geolocator.spare()
+
+
+def test_osm_format(scribbler: ReaperScribbler):
+    geolocator = OsmGeolocator(scribbler, FakeCrawler({}))
+    assert geolocator._format(  # noqa
+        (30.52, 50.45),
+        {
+            'state': 'Київ', 'county': None, 'locality': 'Київ',
+            'neighbourhood': 'Липки', 'road': 'вулиця Інститутська'
+        }
+    ) == {
+        'lon': '30.52',
+        'lat': '50.45',
+        'display_name': 'вулиця Інститутська, Липки, Київ, Київ, Україна',
+        'address': {
+            'road': 'вулиця Інститутська',
+            'neighbourhood': 'Липки',
+            'city': 'Київ',
+            'state': 'Київ',
+            'country': 'Україна'
+        }
+    }
+    assert geolocator._format(  # noqa
+        (30.52, 50.45),
+        {
+            'state': 'Київ', 'county': None, 'locality': 'Київ',
+            'neighbourhood': None, 'road': 'вулиця ' * 20
+        }
+    )['address']['road'] == ('вулиця ' * 20)[:80]
+    assert geolocator._format((20.0, 40.0), dict.fromkeys(  # noqa
+        ('state', 'county', 'locality', 'neighbourhood', 'road')
+    )) == {}
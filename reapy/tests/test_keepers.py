@@ -0,0 +1,14 @@
+from datetime import date
+from pytest import mark
+from core.keepers import FlatPartitionKeeper
+
+
+@mark.parametrize('day, months, expected', [
+    (date(2019, 9, 17), 0, date(2019, 9, 1)),
+    (date(2019, 9, 17), 2, date(2019, 11, 1)),
+    (date(2019, 11, 30), 3, date(2020, 2, 1)),
+    (date(2019, 9, 1), -24, date(2017, 9, 1)),
+    (date(2019, 1, 31), -1, date(2018, 12, 1))
+])
+def test_shift(day: date, months: int, expected: date):
+    assert FlatPartitionKeeper._shift(day, months) == expected  # noqa
@@ -0,0 +1,70 @@
+from asyncio import ensure_future, sleep
+from time import monotonic
+from pytest import fixture, mark
+from core.limiters import AdaptiveLimiter, TokenBucket
+
+
+@fixture
+def limiter() -> AdaptiveLimiter:
+    return AdaptiveLimiter(4, 6, 0.5)
+
+
+def test_additive_increase(limiter: AdaptiveLimiter):
+    for _ in range(4):
+        limiter.succeed(0.1)
+    assert limiter.limit == 4
+    limiter.succeed(0.1)
+    assert limiter.limit == 5
+    for _ in range(100):
+        limiter.succeed(0.1)
+    assert limiter.limit == 6
+    assert limiter.stats['successes'] == 105
+    assert abs(limiter.stats['latency'] - 0.1) < 1e-9
+
+
+def test_multiplicative_decrease(limiter: AdaptiveLimiter):
+    limiter.fail()
+    assert limiter.limit == 2
+    limiter.fail()
+    assert limiter.limit == 2
+    limiter._decreased = 0.0
+    limiter.succeed(0.7)
+    assert limiter.limit == 1
+    limiter._decreased = 0.0
+    limiter.fail()
+    assert limiter.limit == 1
+    assert limiter.stats['failures'] == 4
+
+
+@mark.asyncio
+async def test_acquire():
+    limiter = AdaptiveLimiter(4, 6, 0.5)
+    for _ in range(4):
+        await limiter.acquire()
+    waiter = ensure_future(limiter.acquire())
+    await sleep(0.01)
+    assert not waiter.done()
+    await limiter.release()
+    await sleep(0.01)
+    assert waiter.done()
+    assert limiter.stats['in_flight'] == 4
+    limiter.fail()
+    for _ in range(2):
+        await limiter.release()
+    waiter = ensure_future(limiter.acquire())
+    await sleep(0.01)
+    assert not waiter.done()
+    await limiter.release()
+    await sleep(0.01)
+    assert waiter.done()
+
+
+@mark.asyncio
+async def test_token_bucket(tmp_path):
+    path = str(tmp_path / 'api.bucket')
+    buckets = TokenBucket(path, 20, 2), TokenBucket(path, 20, 2)
+    start = monotonic()
+    for i in range(6):
+        await buckets[i % 2].acquire()
+    assert monotonic() - start >= 0.19
+    assert buckets[0]._take() > 0  # noqa
@@ -1,6 +1,7 @@
 from datetime import date
 from decimal import Decimal
 from pytest import fixture, raises
+from core.backends import SoupBackend, LxmlBackend
 from core.utils import read
 from core.structs import Flat
 from core.parsers import OlxFlatParser, DomRiaFlatParser, EstateParser
@@ -48,9 +49,9 @@ def test_int_emptiness(estate_parser: EstateParser):
     assert estate_parser._int(' - 19 ') is None  # noqa
 
 
-@fixture
-def olx_flat_parser() -> OlxFlatParser:
-    return OlxFlatParser()
+@fixture(params=[SoupBackend(), LxmlBackend()], ids=['soup', 'lxml'])
+def olx_flat_parser(request) -> OlxFlatParser:
+    return OlxFlatParser(request.param)
 
 
 def test_parse_stop_olx_flat(olx_flat_parser: OlxFlatParser):
@@ -384,9 +385,9 @@ def test_parse_offer_olx_flat_invalid(olx_flat_parser: OlxFlatParser):
     assert None is olx_flat_parser.parse_offer(None)  # noqa
 
 
-@fixture
-def dom_ria_flat_parser() -> DomRiaFlatParser:
-    return DomRiaFlatParser()
+@fixture(params=[SoupBackend(), LxmlBackend()], ids=['soup', 'lxml'])
+def dom_ria_flat_parser(request) -> DomRiaFlatParser:
+    return DomRiaFlatParser(request.param)
 
 
 def test_parse_stop_dom_ria_flat(dom_ria_flat_parser: DomRiaFlatParser):
@@ -909,3 +910,24 @@ def test_parse_junk_dom_ria_flat_emptiness(
     })
     assert dom_ria_flat_parser.parse_junk({}) is None
     assert dom_ria_flat_parser.parse_junk(None) is None  # noqa
+
+
+def test_parse_offer_dom_ria_flat_fallback(
+    dom_ria_flat_parser: DomRiaFlatParser
+):
+    markup = read('fixtures/test_parse_offer/dom_ria_flat4.html')
+    offer = {
+        'url': 'https://dom.ria.com/uk/realty-perevireno-prodaja-'
+               'kvartira-kiev-dneprovskiy-prajskaya-ulitsa-15581555.html',
+        'avatar': None,
+        'area': 44.9,
+        'living_area': 29.5,
+        'kitchen_area': 7.8
+    }
+    extracted = dom_ria_flat_parser.parse_offer({**offer, 'markup': markup})
+    parsed = dom_ria_flat_parser.parse_offer({
+        **offer, 'markup': markup.replace('"mainCharacteristics"', '"_"')
+    })
+    assert parsed.published.month == 4 and parsed.published.day == 22
+    parsed.published = extracted.published
+    assert parsed == extracted
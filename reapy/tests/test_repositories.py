@@ -1,14 +1,19 @@
-from datetime import date
+from datetime import date, datetime, timezone
 from decimal import Decimal
-from typing import Callable, List
+from json import loads
+from typing import Any, Callable, Dict, Iterator, List
 from asyncpg import Connection, Record
 from asyncpg.pool import Pool
 from asynctest import CoroutineMock, Mock
 from pytest import fixture, mark
 from core import TESTING_DSN
-from core.repositories import FlatRepository
+from core.repositories import FlatRepository, FlatPartitionRepository
 from core.structs import Flat
 
+# Number of rows in the seeded tables of the query plans' tests (enough for
+# the planner to prefer the indices, few enough to be seeded in seconds)
+seeded_rows = 20000
+
 
 @fixture
 async def flat_repository() -> FlatRepository:
@@ -27,6 +32,8 @@ async def flat_repository() -> FlatRepository:
 async def truncate_tables(pool: Pool):
     async with pool.acquire() as connection:
         await connection.execute('TRUNCATE TABLE flats_details CASCADE')
+        await connection.execute('TRUNCATE TABLE flat_prices CASCADE')
+        await connection.execute('TRUNCATE TABLE core_user_saved_flats CASCADE')
         await connection.execute('TRUNCATE TABLE details CASCADE')
         await connection.execute('TRUNCATE TABLE flats CASCADE')
         await connection.execute('TRUNCATE TABLE geolocations CASCADE')
@@ -165,6 +172,104 @@ async def test_find_flat_almost_found(
     )
 
 
+@mark.asyncio
+@find_flat
+async def test_find_flats(
+    flat_repository: FlatRepository, connection: Connection,
+    flats: List[Record], geolocations: List[Record]
+):
+    records = await flat_repository._find_records(  # noqa
+        connection,
+        [
+            Flat(
+                url='xx3', geolocation={'point': (34.23, 35.0765)}, area=50,
+                rooms=2, floor=4, total_floor=9
+            ),
+            Flat(
+                url='xx11', geolocation={'point': (44.29099, 32.05321)},
+                area=71.1, rooms=2, floor=7, total_floor=9
+            ),
+            Flat(url='xx2', geolocation={'point': (0, 0)}),
+            Flat(
+                url='xx7', geolocation={'point': (44.3043, 32.09542)},
+                area=69.5, rooms=2, floor=7, total_floor=9
+            )
+        ]
+    )
+    assert records[0] is None
+    assert records[1]['id'] == flats[0]['id']
+    assert records[1]['geolocation_id'] == geolocations[0]['id']
+    assert records[2]['id'] == flats[1]['id']
+    assert records[2]['price'] == Decimal('50000.000')
+    assert records[3] is None
+
+
+def plan_nodes(plan: Dict[str, Any]) -> Iterator[Dict[str, Any]]:
+    yield plan
+    for subplan in plan.get('Plans', []):
+        yield from plan_nodes(subplan)
+
+
+@mark.asyncio
+@mark.timeout(60)
+async def test_find_flat_plan(flat_repository: FlatRepository):
+    async with flat_repository._pool.acquire() as connection:  # noqa
+        await connection.execute(
+            '''
+            INSERT INTO geolocations (point) 
+            SELECT st_setsrid(
+                st_point(22 + random() * 18, 44 + random() * 8), 4326
+            ) 
+            FROM generate_series(1, $1)
+            ''',
+            seeded_rows
+        )
+        await connection.execute('''
+            INSERT INTO flats (
+                url, published, price, rate, area, rooms, floor, 
+                total_floor, geolocation_id, is_visible
+            ) 
+            SELECT 'seed' || id, DATE '2019-09-01', 30000, 500, 
+            40 + id % 60, 1 + id % 5, 1 + id % 9, 9 + id % 7, id, TRUE 
+            FROM geolocations
+        ''')
+        await connection.execute('ANALYZE geolocations')
+        await connection.execute('ANALYZE flats')
+        # flats are scanned through the partition which holds the seed
+        seeded = await connection.fetchval(
+            'SELECT tableoid::regclass::text FROM flats WHERE url = \'seed7\''
+        )
+        plan = loads(await connection.fetchval(
+            'EXPLAIN (FORMAT JSON) ' +
+            FlatRepository._statements['find_flat'],  # noqa
+            'seed7', 3, 8, 9, 64.5, 1.5, 30.52, 50.45, 4500
+        ))[0]['Plan']
+    scans = [
+        n for n in plan_nodes(plan)
+        if n.get('Relation Name') in (seeded, 'geolocations')
+    ]
+    assert {n['Relation Name'] for n in scans} == {seeded, 'geolocations'}
+    assert all(n['Node Type'] != 'Seq Scan' for n in scans)
+
+
+@mark.asyncio
+@find_flat
+async def test_find_geolocation(
+    flat_repository: FlatRepository, connection: Connection,  # noqa
+    flats: List[Record], geolocations: List[Record]  # noqa
+):
+    assert await flat_repository.find_geolocation(
+        (44.2910001, 32.0532501)
+    ) == {
+        'state': None, 'locality': 'Sraka', 'county': None,
+        'neighbourhood': None, 'road': None, 'house_number': None,
+        'point': (44.2910001, 32.0532501)
+    }
+    assert None is await flat_repository.find_geolocation(
+        (44.2915, 32.0535)
+    )
+
+
 def update_flat(function: Callable) -> Callable:
     async def wrapper(flat_repository: FlatRepository):
         async with flat_repository._pool.acquire() as connection:  # noqa
@@ -179,6 +284,7 @@ def update_flat(function: Callable) -> Callable:
                 ('f1', 'v1', 'g1'), ('f2', 'v2', 'g2'), ('f3', 'v3', 'g3')
                 RETURNING id
             ''')
+            await flat_repository.refresh_details()
             flats = await connection.fetch(
                 '''
                 INSERT INTO flats (
@@ -270,6 +376,68 @@ async def test_update_flat_success(
     assert record['id'] == flats[1]['id']
 
 
+@mark.asyncio
+@update_flat
+async def test_update_flats_history(
+    flat_repository: FlatRepository,
+    connection: Connection,
+    flats: List[Record]
+):
+    kept = await connection.fetch('''
+        SELECT ctid FROM flats_details 
+        WHERE flat_id = $1 AND detail_id IN (
+            SELECT id FROM details WHERE value = 'v1'
+        )
+    ''', flats[1]['id'])
+    await flat_repository._update_records(  # noqa
+        connection,
+        [
+            (
+                flats[0],
+                Flat(
+                    url='url1', published=date(2019, 5, 17),
+                    price=Decimal('37400.000'), rate=Decimal('534.290'),
+                    area=70, rooms=3, floor=7, total_floor=10,
+                    observed=datetime(2019, 5, 18, tzinfo=timezone.utc)
+                )
+            ),
+            (
+                flats[1],
+                Flat(
+                    url='url2', published=date(2019, 5, 1),
+                    price=Decimal('36480.000'), rate=Decimal('570.000'),
+                    area=64, rooms=2, floor=4, total_floor=9,
+                    details=['v1', 'v3']
+                )
+            )
+        ]
+    )
+    prices = await connection.fetch(
+        'SELECT flat_id, price, rate FROM flat_prices ORDER BY price'
+    )
+    assert [tuple(p) for p in prices] == [
+        (flats[1]['id'], Decimal('36480.00'), Decimal('570.00')),
+        (flats[0]['id'], Decimal('37400.00'), Decimal('534.29'))
+    ]
+    assert datetime(2019, 5, 18, tzinfo=timezone.utc) == await connection.fetchval(
+        'SELECT observed_at FROM flat_prices WHERE flat_id = $1', flats[0]['id']
+    )
+    assert kept == await connection.fetch('''
+        SELECT ctid FROM flats_details 
+        WHERE flat_id = $1 AND detail_id IN (
+            SELECT id FROM details WHERE value = 'v1'
+        )
+    ''', flats[1]['id'])
+    assert {'v1', 'v3'} == {
+        r['value'] for r in await connection.fetch('''
+            SELECT value FROM flats_details JOIN details ON detail_id = id 
+            WHERE flat_id = $1
+        ''', flats[1]['id'])
+    }
+    flat_repository._scribbler.add.assert_any_call('updated', 1)  # noqa
+    flat_repository._scribbler.add.assert_any_call('duplicated', 1)  # noqa
+
+
 def distinct_flat(function: Callable) -> Callable:  # TODO
     async def wrapper(flat_repository: FlatRepository):
         async with flat_repository._pool.acquire() as connection:  # noqa
@@ -318,6 +486,7 @@ def create_flat(function: Callable) -> Callable:
                 ('bathrooms', '2 bathrooms', 'supplies')
                 RETURNING id
             ''')
+            await flat_repository.refresh_details()
             flats = await connection.fetch(
                 '''
                 INSERT INTO flats (
@@ -469,3 +638,177 @@ async def test_create_failure(
     assert None is await connection.fetchrow('''
         SELECT id FROM flats WHERE url = 'outstanding duplicate'
     ''')
+
+
+@mark.asyncio
+@create_flat
+async def test_create_many_flats(
+    flat_repository: FlatRepository, connection: Connection
+):
+    geolocation = {
+        'point': (44.0672520115, 43.0985213187), 'state': None,
+        'locality': None, 'county': None, 'neighbourhood': None,
+        'road': None, 'house_number': None
+    }
+    await flat_repository.create_many([
+        Flat(
+            url='url4',
+            published=date(2019, 5, 11),
+            geolocation=geolocation,
+            price=Decimal('56000.000'),
+            rate=Decimal('800.000'),
+            area=70,
+            rooms=2,
+            floor=4,
+            total_floor=5,
+            details=['3 passenger elevators', '2 bathrooms']
+        ),
+        Flat(
+            url='url5',
+            published=date(2019, 5, 11),
+            geolocation={
+                **geolocation,
+                'point': (51.342123403, 47.345045433),
+                'locality': 'Одеса'
+            },
+            price=Decimal('35000.000'),
+            rate=Decimal('500.000'),
+            area=70,
+            rooms=2,
+            floor=8,
+            total_floor=9,
+            details=['brick']
+        ),
+        Flat(
+            url='url1',
+            published=date(2019, 5, 11),
+            geolocation=geolocation,
+            price=Decimal('35000.000'),
+            rate=Decimal('500.000'),
+            area=70,
+            rooms=3,
+            floor=1,
+            total_floor=5
+        )
+    ])
+    assert 2 == await connection.fetchval('''
+        SELECT count(DISTINCT f.id) FROM flats f 
+        JOIN geolocations g on f.geolocation_id = g.id 
+        JOIN flats_details fd on fd.flat_id = f.id 
+        JOIN details d on d.id = fd.detail_id 
+        WHERE url = 'url4' AND value = '2 bathrooms' OR 
+        url = 'url5' AND locality = 'Одеса' AND value = 'brick'
+    ''')
+    flat_repository._scribbler.add.assert_any_call('inserted', 2)  # noqa
+    flat_repository._scribbler.add.assert_any_call('duplicated', 1)  # noqa
+
+
+@mark.asyncio
+@create_flat
+async def test_create_many_long_address(
+    flat_repository: FlatRepository, connection: Connection
+):
+    await flat_repository.create_many([
+        Flat(
+            url='url6',
+            published=date(2019, 5, 11),
+            geolocation={
+                'point': (30.5234, 50.4501), 'state': None,
+                'locality': 'Київ', 'county': None, 'neighbourhood': None,
+                'road': 'вулиця ' * 20, 'house_number': '1' * 30
+            },
+            price=Decimal('35000.000'),
+            rate=Decimal('500.000'),
+            area=70,
+            rooms=2,
+            floor=8,
+            total_floor=9
+        )
+    ])
+    record = await connection.fetchrow('''
+        SELECT road, house_number FROM flats f 
+        JOIN geolocations g on f.geolocation_id = g.id 
+        WHERE url = 'url6'
+    ''')
+    assert record['road'] == ('вулиця ' * 20)[:80]
+    assert record['house_number'] == '1' * 20
+
+
+@mark.asyncio
+@create_flat
+async def test_hide_flats(
+    flat_repository: FlatRepository, connection: Connection
+):
+    flat_repository._prefetch = 1  # noqa
+    records = [r async for r in flat_repository.find_visible('^url')]
+    assert sorted(r['url'] for r in records) == ['url1', 'url2']
+    assert [r async for r in flat_repository.find_visible('^https://')] == []
+    await flat_repository.hide_many([
+        r['id'] for r in records if r['url'] == 'url1'
+    ])
+    assert ['url2'] == [
+        r['url'] async for r in flat_repository.find_visible('^url')
+    ]
+    assert 2 == await connection.fetchval('SELECT count(*) FROM flats')
+    flat_repository._scribbler.add.assert_any_call('discarded', 1)  # noqa
+
+
+@mark.asyncio
+async def test_flat_partitions():
+    repository = FlatPartitionRepository(Mock())
+    await repository.prepare(TESTING_DSN)
+    try:
+        async with repository._pool.acquire() as connection:  # noqa
+            await connection.execute(
+                'SELECT create_flats_partition(DATE \'2000-01-01\')'
+            )
+            flat = await connection.fetchval('''
+                WITH geolocation AS (
+                    INSERT INTO geolocations (point) 
+                    VALUES (st_setsrid(st_point(30.5234, 50.4501), 4326)) 
+                    RETURNING id
+                ) 
+                INSERT INTO flats (
+                    url, published, price, rate, area, rooms, floor, 
+                    total_floor, geolocation_id, is_visible
+                ) 
+                SELECT 'archived', DATE '2000-01-15', 30000, 500, 40, 1, 1, 
+                9, id, TRUE 
+                FROM geolocation 
+                RETURNING id
+            ''')
+            await connection.execute(
+                '''
+                INSERT INTO flat_prices (flat_id, price, rate, observed_at) 
+                VALUES ($1, 30000, 500, now())
+                ''',
+                flat
+            )
+        await repository.create_partitions(2)
+        assert await repository.create_partitions(2) == []
+        assert await repository.archive_partitions(date(2000, 2, 1)) == [
+            'flats_y2000m01'
+        ]
+        async with repository._pool.acquire() as connection:  # noqa
+            assert None is not await connection.fetchval(
+                'SELECT to_regclass(\'archive.flats_y2000m01\')'
+            )
+            assert 0 == await connection.fetchval(
+                'SELECT count(*) FROM flat_prices WHERE flat_id = $1', flat
+            )
+            assert 1 == await connection.fetchval(
+                'SELECT count(*) FROM archive.flat_prices WHERE flat_id = $1',
+                flat
+            )
+    finally:
+        async with repository._pool.acquire() as connection:  # noqa
+            await connection.execute('''
+                DROP TABLE IF EXISTS archive.flats_y2000m01, 
+                archive.flats_details, archive.flat_prices, 
+                archive.core_user_saved_flats
+            ''')
+            await connection.execute(
+                'DELETE FROM geolocations WHERE point = '
+                'st_setsrid(st_point(30.5234, 50.4501), 4326)'
+            )
+        await repository.spare()